@@ -0,0 +1,253 @@
+import atexit
+import logging
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CALLMEBOT_URL = "https://api.callmebot.com/whatsapp.php"
+
+# ``key`` groups alerts for coalescing; None means "never merge this one"
+Alert = namedtuple("Alert", ["text", "image", "filename", "key"], defaults=(None, None, None))
+
+
+def _strip_query(message):
+    """``message`` with URL query strings removed; CallMeBot's carry the API key and phone number."""
+    return re.sub(r"\?[^\s'\"]*", "", message)
+
+
+class AlertDeliveryError(Exception):
+    """A transport failed to deliver an alert.
+
+    ``retryable`` is False for errors that will not go away by trying again
+    (bad API key, malformed request). ``retry_after`` is the provider's
+    requested wait in seconds, if it sent one.
+    """
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class CallMeBotTransport:
+    """Sends alerts to WhatsApp through the CallMeBot API.
+
+    Uses one pooled ``requests.Session`` so repeated alerts reuse the TLS
+    connection, and every request has a connect/read timeout. Point
+    ``base_url`` at a local stub server to test without the real API.
+    """
+
+    def __init__(self, phone, apikey, base_url=CALLMEBOT_URL, timeout=(3.05, 15.0), session=None):
+        self.phone = phone
+        self.apikey = apikey
+        self.base_url = base_url
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def send(self, alert):
+        params = {"phone": self.phone, "text": alert.text, "apikey": self.apikey}
+        try:
+            if alert.image is not None:
+                files = {"file": (alert.filename or "alert.jpg", alert.image, "image/jpeg")}
+                response = self.session.post(self.base_url, params=params, files=files, timeout=self.timeout)
+            else:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # requests puts the full URL in its messages, and they end up in logs and /status
+            raise AlertDeliveryError(_strip_query(f"{type(e).__name__}: {e}")) from e
+        except requests.RequestException as e:
+            raise AlertDeliveryError(_strip_query(f"{type(e).__name__}: {e}"), retryable=False) from e
+
+        if response.status_code == 200:
+            return response.text
+        retry_after = response.headers.get("Retry-After")
+        try:
+            retry_after = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            retry_after = None
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise AlertDeliveryError(
+            _strip_query(f"HTTP {response.status_code}: {response.text[:200]}"), retryable=retryable,
+            retry_after=retry_after,
+        )
+
+    def close(self):
+        self.session.close()
+
+
+class _Pending:
+    __slots__ = ("alert", "count", "due")
+
+    def __init__(self, alert, due):
+        self.alert = alert
+        self.count = 1
+        self.due = due
+
+
+class AlertDispatcher:
+    """Background delivery of alerts so the camera loop never waits on HTTP.
+
+    ``submit()`` only queues the alert. A worker thread sends it through
+    ``transport`` (anything with ``send(alert)`` that raises
+    ``AlertDeliveryError``), retrying retryable failures with exponential
+    backoff and jitter up to ``max_retries`` times.
+
+    Sends are rate limited by a token bucket of ``burst`` messages refilled
+    at ``rate_per_minute``. Alerts with the same ``key`` that arrive within
+    ``coalesce_window`` seconds of the first are merged into a single message
+    carrying the newest image and a repeat count, so a burst of detections
+    becomes one notification. At most ``max_pending`` alerts wait in the
+    queue; beyond that the oldest is dropped.
+    """
+
+    def __init__(self, transport, rate_per_minute=6.0, burst=2, max_retries=4, backoff=2.0,
+                 max_backoff=60.0, coalesce_window=5.0, max_pending=50):
+        self.transport = transport
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.coalesce_window = coalesce_window
+        self.max_pending = max_pending
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_error = None
+        self._pending = OrderedDict()
+        self._anonymous = 0
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._cond = threading.Condition()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --------------------------
+    # Producer side
+    # --------------------------
+    def submit(self, alert):
+        """Queue ``alert`` for delivery; never blocks on the network."""
+        if self._closed.is_set():
+            raise RuntimeError("AlertDispatcher is closed")
+        with self._cond:
+            key = alert.key
+            if key is None:
+                self._anonymous += 1
+                key = ("anonymous", self._anonymous)
+            pending = self._pending.get(key)
+            if pending is not None:
+                # Keep the newest text and image, count the repeats
+                if alert.image is None:
+                    alert = alert._replace(image=pending.alert.image, filename=pending.alert.filename)
+                pending.alert = alert
+                pending.count += 1
+                self.coalesced += 1
+                return
+            if len(self._pending) >= self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+                logger.warning(f"Alert queue full; dropped {self.dropped} alerts so far")
+            window = self.coalesce_window if alert.key is not None else 0.0
+            self._pending[key] = _Pending(alert, time.monotonic() + window)
+            self._cond.notify()
+
+    @property
+    def queued(self):
+        with self._cond:
+            return len(self._pending)
+
+    # --------------------------
+    # Worker side
+    # --------------------------
+    def _next_due(self):
+        # Earliest due first: a snapshot queued behind a coalescing alert must not wait out its window
+        with self._cond:
+            while True:
+                if not self._pending:
+                    if self._closed.is_set():
+                        return None
+                    self._cond.wait()
+                    continue
+                key, pending = min(self._pending.items(), key=lambda item: item[1].due)
+                delay = pending.due - time.monotonic()
+                if delay <= 0 or self._closed.is_set():
+                    del self._pending[key]
+                    return pending
+                self._cond.wait(delay)
+
+    def _take_token(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate_per_minute / 60.0)
+            self._refilled = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            wait = (1.0 - self._tokens) * 60.0 / self.rate_per_minute
+            if self._closed.wait(wait):
+                # Shutting down: still honour the rate limit, just don't sleep past it
+                time.sleep(min(wait, 1.0))
+
+    def _deliver(self, pending):
+        alert = pending.alert
+        if pending.count > 1:
+            alert = alert._replace(text=f"{alert.text} (x{pending.count})")
+        for attempt in range(self.max_retries + 1):
+            self._take_token()
+            try:
+                self.transport.send(alert)
+            except AlertDeliveryError as e:
+                self.last_error = str(e)
+                if not e.retryable or attempt == self.max_retries or self._closed.is_set():
+                    self.failed += 1
+                    logger.error(f"Giving up on alert {alert.text!r}: {e}")
+                    return False
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                if e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+                logger.warning(f"Alert delivery failed ({e}); retrying in {delay:.1f}s")
+                if self._closed.wait(delay):
+                    self.failed += 1
+                    return False
+            else:
+                self.sent += 1
+                return True
+
+    def _run(self):
+        while True:
+            pending = self._next_due()
+            if pending is None:
+                return
+            try:
+                self._deliver(pending)
+            except Exception as e:
+                self.failed += 1
+                self.last_error = _strip_query(str(e))
+                logger.error(f"Alert transport {type(self.transport).__name__} crashed: {self.last_error}")
+
+    def close(self, timeout=10.0):
+        """Stop accepting alerts and make a last attempt at anything queued."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        close = getattr(self.transport, "close", None)
+        if close is not None:
+            close()
@@ -1,14 +1,11 @@
 import streamlit as st
-import requests
 import pandas as pd
 import altair as alt
 import os
-from datetime import datetime, timedelta
-import cv2
-import face_recognition
-import csv
+from datetime import timedelta
 import time
-import numpy as np
+
+from service_client import ServiceClient, ServiceUnavailable
 
 # --------------------------
 # Setup
@@ -24,105 +21,82 @@ st.set_page_config(
 page = st.sidebar.selectbox("📂 Select Page", ["📊 Dashboard", "📁 Detection Logs"])
 st.sidebar.title("🛡️ NSMC Home Security System")
 
-# Initialize session state
-if 'app_start_time' not in st.session_state:
-    st.session_state.app_start_time = None
-if 'seen_faces' not in st.session_state:
-    st.session_state.seen_faces = set()
-if 'detection_data' not in st.session_state:
-    st.session_state.detection_data = pd.DataFrame(columns=["timestamp", "label", "alert_triggered"])
-if 'webcam_start_time' not in st.session_state:
-    st.session_state.webcam_start_time = None
-if 'capture_snapshot' not in st.session_state:
-    st.session_state.capture_snapshot = False
-if 'monitoring' not in st.session_state:
-    st.session_state.monitoring = False
-if 'recording' not in st.session_state:
-    st.session_state.recording = False
-if 'video_writer' not in st.session_state:
-    st.session_state.video_writer = None
-
-# CallMeBot API configuration
-CALLMEBOT_API_KEY = "7646080"  # Replace with your actual API key
-WHATSAPP_NUMBER = "+2349160947850"
-
 # --------------------------
-# Load Known Faces
+# Security Service
 # --------------------------
-@st.cache_data
-def load_known_faces():
-    known_faces = []
-    known_names = []
-    for file in os.listdir("known_faces"):
-        image = face_recognition.load_image_file(f"known_faces/{file}")
-        encoding = face_recognition.face_encodings(image)
-        if encoding:
-            known_faces.append(encoding[0])
-            known_names.append(file.split('.')[0])
-        else:
-            st.warning(f"No face encoding found for {file}")
-    if not known_faces:
-        st.error("No known faces loaded. Please add images to the 'known_faces' directory.")
-    return known_faces, known_names
-
-known_faces, known_names = load_known_faces()
+# Capture, recognition, logging and alerts run in security_service.py; this page only reads its state
+SECURITY_SERVICE_URL = os.environ.get("SECURITY_SERVICE_URL", "http://127.0.0.1:8765")
 
-# --------------------------
-# Load Detection Data
-# --------------------------
-csv_path = "detections.csv"
-if not os.path.exists(csv_path):
-    df = pd.DataFrame(columns=["timestamp", "label", "alert_triggered"])
-else:
-    try:
-        df = pd.read_csv(csv_path)
-        if "timestamp" in df.columns:
-            df["timestamp"] = pd.to_datetime(df["timestamp"], errors='coerce')
-            df = df.dropna(subset=["timestamp"])
-        else:
-            st.warning("Invalid columns in detections.csv. Initializing empty DataFrame.")
-            df = pd.DataFrame(columns=["timestamp", "label", "alert_triggered"])
-    except (pd.errors.EmptyDataError, pd.errors.ParserError, Exception) as e:
-        st.warning(f"Error reading detections.csv: {str(e)}. Initializing empty DataFrame.")
-        df = pd.DataFrame(columns=["timestamp", "label", "alert_triggered"])
-# Merge with session state data, avoiding empty concatenation
-if not st.session_state.detection_data.empty:
-    df = pd.concat([df, st.session_state.detection_data], ignore_index=True)
+@st.cache_resource
+def get_service_client():
+    return ServiceClient(SECURITY_SERVICE_URL)
+
+service = get_service_client()
+
+try:
+    status = service.status()
+except ServiceUnavailable as e:
+    st.error(f"{e}\n\nStart it with `python security_service.py` and reload this page.")
+    st.stop()
+settings = status["settings"]
 
 # --------------------------
 # Sidebar Widgets
 # --------------------------
-alarm_active = st.sidebar.checkbox("Activate Alarm System", value=False)
-st.session_state.monitoring = st.sidebar.toggle("🔍 Start Monitoring", value=st.session_state.monitoring)
-
-# Update webcam uptime
-if st.session_state.monitoring and st.session_state.webcam_start_time is None:
-    st.session_state.webcam_start_time = time.time()
-elif not st.session_state.monitoring and st.session_state.webcam_start_time is not None:
-    st.session_state.webcam_start_time = None
-    st.session_state.seen_faces.clear()  # Clear seen faces when monitoring stops
+AUTO_RECORD_OPTIONS = {"Off": "off", "Unknown faces": "unknown", "Unknown faces and motion": "motion"}
+alarm_active = st.sidebar.checkbox("Activate Alarm System", value=settings["alarm_active"])
+max_detection_latency = st.sidebar.slider("⏱️ Max Detection Latency (s)", 0.2, 5.0, float(settings["max_latency"]), 0.1)
+auto_record = st.sidebar.selectbox(
+    "🎬 Auto-record Clips", list(AUTO_RECORD_OPTIONS),
+    index=list(AUTO_RECORD_OPTIONS.values()).index(settings["auto_record"]),
+)
+continuous_recording = st.sidebar.checkbox("📼 Continuous Recording", value=settings["continuous_recording"])
+monitoring = st.sidebar.toggle("🔍 Start Monitoring", value=settings["monitoring"])
+
+# Only send what the user changed; the service starts and stops the camera itself
+changes = {
+    key: value for key, value in {
+        "alarm_active": alarm_active,
+        "max_latency": max_detection_latency,
+        "auto_record": AUTO_RECORD_OPTIONS[auto_record],
+        "continuous_recording": continuous_recording,
+        "monitoring": monitoring,
+    }.items() if value != settings[key]
+}
+if changes:
+    try:
+        settings = service.update_settings(**changes)
+        status = service.status()
+    except ServiceUnavailable as e:
+        st.sidebar.error(str(e))
+    if monitoring and not settings["monitoring"]:
+        st.sidebar.error("Failed to access webcam.")
+
+# Cameras configured in the service (cameras.json or --camera)
+camera_names = list(status["cameras"])
+if len(camera_names) > 1:
+    selected_camera = st.sidebar.selectbox("📷 Camera", camera_names)
+else:
+    selected_camera = camera_names[0]
+camera_status = status["cameras"][selected_camera]
 
 # --------------------------
 # Stats Calculation
 # --------------------------
-if not df.empty and "timestamp" in df.columns:
-    today = pd.Timestamp.now().normalize()
-    detections_today = df[df["timestamp"] >= today]
-    total_detections_today = len(detections_today)
-    intrusion_attempts_today = len(detections_today[detections_today["label"] == "Unknown"])
-
-    known_today = total_detections_today - intrusion_attempts_today
-    success_pct = int((known_today / total_detections_today * 100) if total_detections_today > 0 else 0)
-    vuln_pct = int((intrusion_attempts_today / total_detections_today * 100) if total_detections_today > 0 else 0)
-
-    unknowns = df[df["label"] == "Unknown"]
-    last_alert = unknowns["timestamp"].max() if not unknowns.empty else "No alert yet"
+# Read from the service's running counters rather than rescanning detections
+try:
+    summary_today = service.summary()
+except ServiceUnavailable as e:
+    st.error(str(e))
+    st.stop()
+total_detections_today = summary_today["total"]
+intrusion_attempts_today = summary_today["intrusions"]
+success_pct = summary_today["success_pct"]
+vuln_pct = summary_today["vuln_pct"]
+if summary_today["last_alert"] is not None:
+    last_alert = summary_today["last_alert"]
 else:
-    total_detections_today = 0
-    intrusion_attempts_today = 0
-    success_pct = 0
-    vuln_pct = 0
-    last_alert = "No data"
+    last_alert = "No alert yet" if total_detections_today else "No data"
 
 # --------------------------
 # Donut Chart Function
@@ -174,7 +148,7 @@ def make_donut(input_response, input_text, input_color):
 if page == "📊 Dashboard":
     st.title("🏠 NSMC Home Security System Dashboard")
     st.write(f"**Alarm System Active:** {'✅ Yes' if alarm_active else '❌ No'}")
-    st.write(f"**Monitoring Status:** {'🟢 Running' if st.session_state.monitoring else '🔴 Stopped'}")
+    st.write(f"**Monitoring Status:** {'🟢 Running' if settings['monitoring'] else '🔴 Stopped'}")
 
     col1, col2, col3 = st.columns([1, 2, 1])
 
@@ -185,8 +159,9 @@ if page == "📊 Dashboard":
         # Real-time timer fragment
         @st.fragment(run_every=1)
         def display_timer():
-            if st.session_state.webcam_start_time is not None:
-                uptime_seconds = int(time.time() - st.session_state.webcam_start_time)
+            monitoring_since = status["monitoring_since"]
+            if monitoring_since is not None:
+                uptime_seconds = int(time.time() - monitoring_since)
                 uptime_str = str(timedelta(seconds=uptime_seconds))
             else:
                 uptime_str = "00:00:00"
@@ -199,13 +174,15 @@ if page == "📊 Dashboard":
         # Real-time stats fragment
         @st.fragment(run_every=5)
         def display_stats():
-            today = pd.Timestamp.now().normalize()
-            detections_today = st.session_state.detection_data[st.session_state.detection_data["timestamp"] >= today]
-            total_detections = len(detections_today)
-            intrusion_attempts = len(detections_today[detections_today["label"] == "Unknown"])
-            known_detections = total_detections - intrusion_attempts
-            success_pct = int((known_detections / total_detections * 100) if total_detections > 0 else 0)
-            vuln_pct = int((intrusion_attempts / total_detections * 100) if total_detections > 0 else 0)
+            try:
+                summary = service.summary()
+            except ServiceUnavailable as e:
+                st.error(str(e))
+                return
+            total_detections = summary["total"]
+            intrusion_attempts = summary["intrusions"]
+            success_pct = summary["success_pct"]
+            vuln_pct = summary["vuln_pct"]
 
             st.markdown("**Total Detections Today**")
             st.markdown(f"""
@@ -235,129 +212,29 @@ if page == "📊 Dashboard":
     # Column 2: Webcam Feed with OpenCV
     with col2:
         st.markdown("### 🎥 Webcam Feed")
-        @st.fragment(run_every=0.1)
+        @st.fragment(run_every=0.2)
         def webcam_feed():
-            if st.session_state.monitoring:
-                cap = cv2.VideoCapture(0)  # Open webcam
-                if not cap.isOpened():
-                    st.error("Failed to access webcam.")
+            # The service encodes the annotated frame once, however many dashboards poll it
+            if settings["monitoring"]:
+                jpeg = service.frame_jpeg(selected_camera)
+                if jpeg is None:
+                    st.error("Failed to capture frame.")
                     return
-                placeholder = st.empty()  # Placeholder for frame updates
-                frame_count = 0
-                # Get webcam properties for video recording
-                frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                fps = 20  # Standard frame rate for recording
-
-                while st.session_state.monitoring and cap.isOpened():
-                    ret, img = cap.read()
-                    if not ret:
-                        st.error("Failed to capture frame.")
-                        break
-                    frame_count += 1
-
-                    # Process every 5th frame for face recognition
-                    if frame_count % 5 == 0:
-                        # Resize frame to 50% for faster processing
-                        small_frame = cv2.resize(img, (0, 0), fx=0.5, fy=0.5)
-                        # Convert to RGB for face_recognition
-                        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-
-                        # Perform face detection
-                        face_locations = face_recognition.face_locations(rgb_small_frame, model="hog")
-                        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
-
-                        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                            # Scale coordinates back to original size
-                            top, right, bottom, left = [int(coord * 2) for coord in (top, right, bottom, left)]
-
-                            # Compare with known faces
-                            matches = face_recognition.compare_faces(known_faces, face_encoding, tolerance=0.6)
-                            name = "Unknown"
-                            if True in matches:
-                                index = matches.index(True)
-                                name = known_names[index]
-
-                            # Only log new detections
-                            face_id = f"{name}_{hash(str(face_encoding))}"
-                            if face_id not in st.session_state.seen_faces:
-                                st.session_state.seen_faces.add(face_id)
-
-                                # Log detection
-                                new_detection = pd.DataFrame({
-                                    "timestamp": [datetime.now()],
-                                    "label": [name],
-                                    "alert_triggered": ["Yes" if name == "Unknown" else "No"]
-                                })
-                                if not new_detection.empty:
-                                    st.session_state.detection_data = pd.concat([st.session_state.detection_data, new_detection], ignore_index=True)
-
-                                    # Save to CSV
-                                    file_exists = os.path.isfile(csv_path)
-                                    with open(csv_path, "a", newline="") as f:
-                                        writer = csv.writer(f)
-                                        if not file_exists:
-                                            writer.writerow(["timestamp", "label", "alert_triggered"])
-                                        writer.writerow([datetime.now().strftime("%Y-%m-%d %H:%M:%S"), name, "Yes" if name == "Unknown" else "No"])
-
-                            # Draw rectangle and name on original frame
-                            cv2.rectangle(img, (left, top), (right, bottom), (0, 255, 0), 2)
-                            cv2.putText(img, name, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-
-                        # Debug: Log if no faces were detected
-                        if not face_locations:
-                            print("No faces detected in this frame")
-
-                    # Capture snapshot if requested
-                    if st.session_state.capture_snapshot:
-                        # Create snapshots folder if it doesn't exist
-                        os.makedirs("snapshots", exist_ok=True)
-                        snapshot_path = os.path.join("snapshots", f"snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg")
-                        cv2.imwrite(snapshot_path, img)
-                        # Send snapshot to WhatsApp
-                        try:
-                            with open(snapshot_path, "rb") as file:
-                                files = {"file": (os.path.basename(snapshot_path), file, "image/jpeg")}
-                                response = requests.post(
-                                    f"https://api.callmebot.com/whatsapp.php?phone={WHATSAPP_NUMBER}&text=Snapshot&apikey={CALLMEBOT_API_KEY}",
-                                    files=files
-                                )
-                                if response.status_code == 200:
-                                    # Log response for debugging
-                                    st.write(f"WhatsApp API response: {response.text}")
-                                    st.success("Snapshot sent to WhatsApp")
-                                else:
-                                    st.error(f"Failed to send snapshot to WhatsApp: {response.text}")
-                        except Exception as e:
-                            st.error(f"Error sending snapshot to WhatsApp: {str(e)}")
-                        st.session_state.capture_snapshot = False
-                        st.success(f"Snapshot saved as {snapshot_path}")
-
-                    # Record video if requested
-                    if st.session_state.recording:
-                        if st.session_state.video_writer is None:
-                            # Initialize video writer
-                            os.makedirs("video_records", exist_ok=True)
-                            video_path = os.path.join("video_records", f"video_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
-                            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                            st.session_state.video_writer = cv2.VideoWriter(video_path, fourcc, fps, (frame_width, frame_height))
-                        # Write frame to video
-                        st.session_state.video_writer.write(img)
-
-                    # Convert BGR to RGB for Streamlit
-                    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                    placeholder.image(img_rgb, channels="RGB", use_container_width=True)
-
-                    # Brief sleep to prevent excessive CPU usage
-                    time.sleep(0.05)
-
-                # Release video writer if recording
-                if st.session_state.recording and st.session_state.video_writer is not None:
-                    st.session_state.video_writer.release()
-                    st.session_state.video_writer = None
-                    st.success(f"Video saved as {video_path}")
-
-                cap.release()
+                st.image(jpeg, use_container_width=True)
+                try:
+                    cameras = service.status()["cameras"]
+                except ServiceUnavailable:
+                    cameras = {}
+                # Show what each camera's adaptive scheduler is currently doing
+                for name, camera in cameras.items():
+                    recognition = camera.get("recognition")
+                    if recognition is None:
+                        continue
+                    st.caption(
+                        f"{name}: {recognition['fps'] or 0:.1f} fps, recognition every {recognition['interval']:.2f}s "
+                        f"(~1 in {recognition['stride']} frames, {recognition['reason']}), "
+                        f"{(recognition['latency'] or 0) * 1000:.0f} ms latency"
+                    )
             else:
                 st.info("Monitoring is stopped.")
 
@@ -367,73 +244,116 @@ if page == "📊 Dashboard":
         btn_col3, btn_col4 = st.columns(2)
         with btn_col3:
             if st.button("📸 Capture Snapshot"):
-                st.session_state.capture_snapshot = True
+                try:
+                    snapshot_path = service.snapshot(selected_camera)
+                    st.success(f"Snapshot saved as {snapshot_path} and queued for WhatsApp")
+                except ServiceUnavailable as e:
+                    st.error(f"Cannot capture snapshot: {e}")
         with btn_col4:
             if st.button("📱 Test WhatsApp Notification"):
                 # Send "Alert Test" to WhatsApp
                 try:
-                    response = requests.get(
-                        f"https://api.callmebot.com/whatsapp.php?phone={WHATSAPP_NUMBER}&text=Alert%20Test&apikey={CALLMEBOT_API_KEY}"
-                    )
-                    if response.status_code == 200:
-                        st.success("Test notification sent to WhatsApp")
-                    else:
-                        st.error(f"Failed to send test notification: {response.text}")
-                except Exception as e:
-                    st.error(f"Error sending test notification: {str(e)}")
+                    service.test_alert()
+                    st.success("Test notification queued for WhatsApp")
+                except ServiceUnavailable as e:
+                    st.error(f"Cannot send test notification: {e}")
+            alerts = status["alerts"]
+            if alerts["last_error"]:
+                st.caption(
+                    f"WhatsApp: {alerts['sent']} sent, {alerts['failed']} failed, "
+                    f"{alerts['queued']} queued. Last error: {alerts['last_error']}"
+                )
 
     # Column 3: Controls
     with col3:
         st.markdown("### ⚙️ Controls")
         if st.button("🔄 Refresh Data"):
-            st.cache_data.clear()
-            st.rerun()
-
-        if not df.empty:
-            csv = df.to_csv(index=False).encode("utf-8")
-            st.download_button(
-                label="📁 Export Data (CSV)",
-                data=csv,
-                file_name="detection_data.csv",
-                mime="text/csv"
-            )
-        else:
-            st.info("No data to export.")
+            # Picks up added or changed photos in known_faces/; the service re-encodes them in the background
+            try:
+                service.reload_faces()
+                st.success("Reloading known faces")
+            except ServiceUnavailable as e:
+                st.error(f"Cannot reload known faces: {e}")
+        faces = status["faces"]
+        if faces["reloading"]:
+            st.caption("Encoding new or changed photos in known_faces/...")
+        elif faces["last_error"]:
+            st.caption(f"Last reload of known faces failed: {faces['last_error']}")
+
+        # The full history is only fetched from the service when an export is asked for
+        if st.button("📁 Prepare Export (CSV)"):
+            try:
+                st.session_state.export_csv = service.detections_csv()
+            except ServiceUnavailable as e:
+                st.error(f"Cannot export data: {e}")
+        csv = st.session_state.get("export_csv")
+        if csv is not None:
+            if csv.count(b"\n") > 1:
+                st.download_button(
+                    label="💾 Download CSV",
+                    data=csv,
+                    file_name="detection_data.csv",
+                    mime="text/csv"
+                )
+            else:
+                st.info("No data to export.")
 
         st.markdown("---")
         if st.button("🎥 Record Video Clip"):
-            if st.session_state.recording:
-                # Stop recording
-                st.session_state.recording = False
-                if st.session_state.video_writer is not None:
-                    st.session_state.video_writer.release()
-                    st.session_state.video_writer = None
-                    st.success(f"Video saved as {video_path}")
-            else:
-                # Start recording
-                if st.session_state.monitoring:
-                    st.session_state.recording = True
-                    st.success("Started recording video")
+            try:
+                if camera_status["recording"]:
+                    # Stop recording; the service finishes the clip in the background
+                    service.record(False, selected_camera)
+                    st.success("Stopped recording; the clip is saved to video_records/")
                 else:
-                    st.error("Cannot record video: Monitoring is not active")
+                    service.record(True, selected_camera)
+                    st.success("Started recording video")
+            except ServiceUnavailable:
+                st.error("Cannot record video: Monitoring is not active")
+        last_clip = camera_status.get("last_clip")
+        if last_clip is not None:
+            st.caption(
+                f"Last clip: {last_clip['path']} ({', '.join(last_clip['reasons'])}, "
+                f"{last_clip['frames']} frames at {last_clip['fps']:.1f} fps)"
+            )
 
 # --------------------------
 # Page 2: Detection Logs
 # --------------------------
 elif page == "📁 Detection Logs":
     st.title("📁 Detection Logs & Trend Analysis")
+    try:
+        recent = service.recent(10)
+    except ServiceUnavailable as e:
+        st.error(str(e))
+        st.stop()
 
-    if not df.empty:
+    if not recent.empty:
         st.subheader("🔍 Recent Detections")
-        st.dataframe(df.tail(10), use_container_width=True)
-
-        if "timestamp" in df.columns and "label" in df.columns:
-            st.subheader("📈 Detection Trend Over Time")
-            chart = alt.Chart(df).mark_bar().encode(
-                x='timestamp:T',
-                y='count()',
-                color='label:N'
-            ).properties(width=800, height=300)
-            st.altair_chart(chart, use_container_width=True)
+        st.dataframe(recent, use_container_width=True)
+
+        st.subheader("📈 Detection Trend Over Time")
+        trend_ranges = {
+            "Last hour": pd.Timedelta(hours=1),
+            "Last 24 hours": pd.Timedelta(days=1),
+            "Last 7 days": pd.Timedelta(days=7),
+            "Last 30 days": pd.Timedelta(days=30),
+            "All time": None,
+        }
+        trend_range = st.selectbox("Time range", list(trend_ranges), index=len(trend_ranges) - 1)
+        # None lets the service start at its first bucket
+        trend_start = None if trend_ranges[trend_range] is None else pd.Timestamp.now() - trend_ranges[trend_range]
+        # Pre-aggregated buckets, so the chart ships at most a few thousand points
+        try:
+            trend = service.series(trend_start)
+        except ServiceUnavailable as e:
+            st.error(str(e))
+            st.stop()
+        chart = alt.Chart(trend).mark_bar().encode(
+            x=alt.X('timestamp:T', title=f"Time (per {trend.attrs['resolution']})"),
+            y=alt.Y('sum(count):Q', title='Detections'),
+            color='label:N'
+        ).properties(width=800, height=300)
+        st.altair_chart(chart, use_container_width=True)
     else:
         st.info("No detection data available yet.")
\ No newline at end of file
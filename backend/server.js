@@ -10,8 +10,39 @@ app.get("/", (req, res) => {
     res.send("Backend is running...");
 });
 
+let serviceProcess = null;
+
+// The recognition service owns the camera; the Streamlit dashboard is only a client of it
+function startSecurityService() {
+    if (serviceProcess) {
+        return;
+    }
+    serviceProcess = spawn(
+        "python",
+        [path.join(__dirname, "../security_service.py")],
+        {
+            stdio: "inherit",
+            shell: true,
+            cwd: path.join(__dirname, "..")
+        }
+    );
+
+    serviceProcess.on("close", (code) => {
+        console.log(`Security service exited with code ${code}`);
+        serviceProcess = null;
+    });
+}
+
+// Route to start the recognition service on its own
+app.get("/start-service", (req, res) => {
+    startSecurityService();
+    res.send("✅ Security service is starting...");
+});
+
 // Route to start Streamlit
 app.get("/start-streamlit", (req, res) => {
+    startSecurityService();
+
     const streamlitProcess = spawn(
         "streamlit",
         ["run", path.join(__dirname, "../app.py")],
@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ``image`` is a read-only view into the ring; copy it before drawing on it
+Frame = namedtuple("Frame", ["seq", "timestamp", "image"])
+
+# ``source`` is a USB camera index, an RTSP/HTTP URL or a video file path
+CameraConfig = namedtuple("CameraConfig", ["name", "source"])
+
+
+def parse_source(source):
+    # "0" means USB camera 0; URLs and file paths go to OpenCV as they are
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source)
+    return source
+
+
+def load_camera_configs(path="cameras.json"):
+    """Cameras listed in ``path`` as ``[{"name": ..., "source": ...}, ...]``.
+
+    Without the file the system runs on the default webcam.
+    """
+    if not os.path.exists(path):
+        return [CameraConfig("camera", 0)]
+    with open(path) as f:
+        entries = json.load(f)
+    configs = [CameraConfig(entry["name"], parse_source(entry["source"])) for entry in entries]
+    if not configs:
+        raise ValueError(f"{path} lists no cameras; remove it to use the default webcam")
+    names = [config.name for config in configs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Camera names in {path} must be unique: {names}")
+    return configs
+
+
+class FrameRing:
+    """Preallocated ring of frames with sequence numbers and capture times.
+
+    The writer always fills the oldest slot, so a slow consumer never blocks
+    capture: it simply skips to the newest frame (drop-oldest). Readers get
+    views into the ring without copying; a view stays valid until the writer
+    wraps around to its slot.
+    """
+
+    def __init__(self, capacity, shape, dtype=np.uint8):
+        self.capacity = capacity
+        self.frames = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        self.seqs = np.full(capacity, -1, dtype=np.int64)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.seq = -1
+        self._cond = threading.Condition()
+
+    def write_slot(self):
+        """Slot to fill with the next frame; ``commit`` publishes it."""
+        return self.frames[(self.seq + 1) % self.capacity]
+
+    def commit(self, timestamp=None):
+        with self._cond:
+            self.seq += 1
+            slot = self.seq % self.capacity
+            self.seqs[slot] = self.seq
+            self.timestamps[slot] = time.time() if timestamp is None else timestamp
+            self._cond.notify_all()
+        return self.seq
+
+    def _frame(self, seq):
+        slot = seq % self.capacity
+        view = self.frames[slot].view()
+        view.flags.writeable = False
+        return Frame(seq, float(self.timestamps[slot]), view)
+
+    def latest(self):
+        with self._cond:
+            return self._frame(self.seq) if self.seq >= 0 else None
+
+    def wait_newer(self, after_seq, timeout=None):
+        """Block until a frame newer than ``after_seq`` exists; return the newest."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.seq > after_seq, timeout):
+                return None
+            return self._frame(self.seq)
+
+
+class CameraStream:
+    """Owns one ``cv2.VideoCapture`` and a capture thread feeding a ``FrameRing``.
+
+    Open it once per monitoring session with ``start()`` and release it with
+    ``stop()``; recognition, display and recording all read from ``ring``.
+    Video files are played back at their own frame rate and loop; network
+    streams are reopened after ``reconnect_after`` failed reads in a row.
+    """
+
+    def __init__(self, src=0, capacity=8, reconnect_after=50):
+        self.src = parse_source(src)
+        self.capacity = capacity
+        self.reconnect_after = reconnect_after
+        self.is_file = isinstance(self.src, str) and os.path.isfile(self.src)
+        self.cap = None
+        self.ring = None
+        self.width = 0
+        self.height = 0
+        self.frames_read = 0
+        self.failed_reads = 0
+        # Smoothed capture rate, None until two frames have been read
+        self.fps = None
+        self._running = False
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        if self._running:
+            return True
+        self.cap = cv2.VideoCapture(self.src)
+        if not self.cap.isOpened():
+            self.cap.release()
+            self.cap = None
+            return False
+        ok, first = self.cap.read()
+        if not ok:
+            self.cap.release()
+            self.cap = None
+            return False
+        self.height, self.width = first.shape[:2]
+        self.fps = None
+        self.ring = FrameRing(self.capacity, first.shape, first.dtype)
+        self.ring.write_slot()[...] = first
+        self.ring.commit()
+        self._running = True
+        self._thread = threading.Thread(target=self._update, name=f"camera-{self.src}", daemon=True)
+        self._thread.start()
+        return True
+
+    def _update(self):
+        # Files would otherwise be decoded as fast as the CPU allows
+        frame_time = 1.0 / (self.cap.get(cv2.CAP_PROP_FPS) or 25.0) if self.is_file else 0.0
+        next_frame = time.monotonic()
+        last_commit = None
+        consecutive_failures = 0
+        while self._running:
+            slot = self.ring.write_slot()
+            # Decode straight into the ring slot instead of allocating a new frame
+            ok, image = self.cap.read(slot)
+            if not ok:
+                self.failed_reads += 1
+                consecutive_failures += 1
+                if self.is_file and consecutive_failures == 1:
+                    # End of file: loop
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                if self.failed_reads % 50 == 1:
+                    logger.warning(f"Camera {self.src}: failed to read frame")
+                if isinstance(self.src, str) and consecutive_failures >= self.reconnect_after:
+                    logger.warning(f"Camera {self.src}: reconnecting")
+                    self.cap.release()
+                    self.cap = cv2.VideoCapture(self.src)
+                    consecutive_failures = 0
+                time.sleep(0.05)
+                continue
+            consecutive_failures = 0
+            if image is not slot:
+                slot[...] = image
+            self.ring.commit()
+            self.frames_read += 1
+            now = time.monotonic()
+            if last_commit is not None and now > last_commit:
+                instant_fps = 1.0 / (now - last_commit)
+                self.fps = instant_fps if self.fps is None else self.fps + 0.1 * (instant_fps - self.fps)
+            last_commit = now
+            if frame_time:
+                next_frame = max(next_frame + frame_time, time.monotonic() - frame_time)
+                time.sleep(max(0.0, next_frame - time.monotonic()))
+
+    def latest(self):
+        return self.ring.latest() if self.ring is not None else None
+
+    def wait_newer(self, after_seq, timeout=1.0):
+        return self.ring.wait_newer(after_seq, timeout) if self.ring is not None else None
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
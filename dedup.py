@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+
+from matcher import UNKNOWN
+
+
+def detection_key(name, track_id=None):
+    # Known people dedupe on identity; unknown faces can only be told apart by track
+    if name == UNKNOWN and track_id is not None:
+        return f"{UNKNOWN}#{track_id}"
+    return name
+
+
+class DetectionDeduper:
+    """Decides whether a detection is new enough to be logged.
+
+    A key is logged at most once per ``cooldown`` seconds. Entries live in an
+    ``OrderedDict`` ordered by when they were last logged: expired entries
+    are evicted from the old end as new detections arrive, and the table
+    never holds more than ``max_entries`` keys, so memory stays constant
+    however long monitoring runs.
+    """
+
+    def __init__(self, cooldown=60.0, max_entries=1024):
+        self.cooldown = cooldown
+        self.max_entries = max_entries
+        self._last_logged = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._last_logged)
+
+    def should_log(self, key, timestamp):
+        with self._lock:
+            while self._last_logged:
+                oldest_key, oldest = next(iter(self._last_logged.items()))
+                if timestamp - oldest < self.cooldown:
+                    break
+                del self._last_logged[oldest_key]
+
+            last = self._last_logged.get(key)
+            if last is not None and timestamp - last < self.cooldown:
+                return False
+            self._last_logged[key] = timestamp
+            self._last_logged.move_to_end(key)
+            if len(self._last_logged) > self.max_entries:
+                self._last_logged.popitem(last=False)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._last_logged.clear()
@@ -0,0 +1,100 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class DetectionBuffer:
+    """Append-only columnar buffer of this session's detections.
+
+    Timestamps (int64 ns), label codes and alert flags live in preallocated
+    NumPy arrays that double in size when full, so an append is amortised
+    O(1) instead of copying the whole history the way ``pd.concat`` does.
+    With ``max_rows`` set the arrays stop growing at that size and the oldest
+    rows are overwritten, keeping memory flat over multi-day sessions.
+    Appends and reads may come from different threads.
+    """
+
+    def __init__(self, initial_capacity=256, max_rows=100000):
+        self.max_rows = max_rows
+        capacity = min(initial_capacity, max_rows) if max_rows else initial_capacity
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._labels = np.empty(capacity, dtype=np.int32)
+        self._alerts = np.empty(capacity, dtype=bool)
+        self._head = 0
+        self._size = 0
+        self.labels = []
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def empty(self):
+        return self._size == 0
+
+    def _grow(self):
+        capacity = len(self._timestamps) * 2
+        if self.max_rows:
+            capacity = min(capacity, self.max_rows)
+        for name in ("_timestamps", "_labels", "_alerts"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def append(self, timestamp, label, alert_triggered):
+        if isinstance(alert_triggered, str):
+            alert_triggered = alert_triggered == "Yes"
+        timestamp = pd.Timestamp(timestamp).value
+        with self._lock:
+            self._append(timestamp, label, bool(alert_triggered))
+
+    def _append(self, timestamp, label, alert):
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+
+        capacity = len(self._timestamps)
+        if self._size == capacity and (not self.max_rows or capacity < self.max_rows):
+            self._grow()
+            capacity = len(self._timestamps)
+        if self._size < capacity:
+            index = self._size
+            self._size += 1
+        else:
+            # Full at max_rows: overwrite the oldest row
+            index = self._head
+            self._head = (self._head + 1) % capacity
+        self._timestamps[index] = timestamp
+        self._labels[index] = code
+        self._alerts[index] = alert
+
+    def _ordered(self, column):
+        # Always a copy, so the frame is unaffected by later appends
+        if self._head == 0:
+            return column[:self._size].copy()
+        return np.concatenate([column[self._head:self._size], column[:self._head]])
+
+    def frame(self, start=None):
+        """The buffered rows (from ``start`` on) in the dashboard's DataFrame layout."""
+        with self._lock:
+            timestamps = self._ordered(self._timestamps)
+            labels = self._ordered(self._labels)
+            alerts = self._ordered(self._alerts)
+            categories = list(self.labels)
+        if start is not None:
+            mask = timestamps > pd.Timestamp(start).value
+            timestamps, labels, alerts = timestamps[mask], labels[mask], alerts[mask]
+        return pd.DataFrame({
+            "timestamp": pd.to_datetime(timestamps, unit="ns"),
+            "label": pd.Categorical.from_codes(labels, categories=categories),
+            "alert_triggered": np.where(alerts, "Yes", "No"),
+        })
+
+    def clear(self):
+        with self._lock:
+            self._head = 0
+            self._size = 0
@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    alert INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_detections_timestamp ON detections (timestamp);
+CREATE INDEX IF NOT EXISTS idx_detections_label_timestamp ON detections (label, timestamp);
+CREATE TABLE IF NOT EXISTS migrations (source TEXT PRIMARY KEY);
+"""
+
+INSERT_SQL = "INSERT INTO detections (timestamp, label, alert) VALUES (?, ?, ?)"
+
+
+def _range_clause(start, end):
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("timestamp >= ?")
+        params.append(pd.Timestamp(start).value)
+    if end is not None:
+        clauses.append("timestamp < ?")
+        params.append(pd.Timestamp(end).value)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class SqliteDetectionStore:
+    """SQLite detection log for concurrent readers and one writer.
+
+    The database runs in WAL mode, so the dashboard, exports and the
+    recognition loop can read while the sink writes. The store holds two
+    connections, one for writes and one for reads, each used by one thread
+    at a time; per-thread connections would pile up, since every HTTP
+    request and Streamlit rerun runs on a new thread. Timestamps are stored as int64 nanoseconds and indexed on
+    ``(timestamp)`` and ``(label, timestamp)``. Offers the same repository
+    methods as ``detection_store.DetectionStore``.
+    """
+
+    def __init__(self, path="detections.db"):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._reader = self._connect()
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _conn(self, write=False):
+        lock, conn = (self._write_lock, self._writer) if write else (self._read_lock, self._reader)
+        with lock:
+            if conn is None:
+                raise sqlite3.ProgrammingError("Detection store is closed")
+            yield conn
+
+    # --------------------------
+    # Writes
+    # --------------------------
+    def write_batch(self, rows, fsync=False):
+        """Insert ``(timestamp, label, alert_triggered)`` rows in one transaction."""
+        params = []
+        for timestamp, label, alert in rows:
+            if isinstance(alert, str):
+                alert = alert == "Yes"
+            params.append((pd.Timestamp(timestamp).value, label, int(bool(alert))))
+        with self._conn(write=True) as conn:
+            if fsync:
+                # NORMAL skips the fsync on commit in WAL mode; FULL makes this batch durable
+                conn.execute("PRAGMA synchronous=FULL")
+            with conn:
+                conn.executemany(INSERT_SQL, params)
+            if fsync:
+                conn.execute("PRAGMA synchronous=NORMAL")
+
+    def close(self):
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._read_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    # --------------------------
+    # Reads
+    # --------------------------
+    def _frame(self, sql, params):
+        with self._conn() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        df = pd.DataFrame(rows, columns=["timestamp", "label", "alert"])
+        return pd.DataFrame({
+            "timestamp": pd.to_datetime(df["timestamp"].astype("int64"), unit="ns"),
+            "label": df["label"].astype("category"),
+            "alert_triggered": df["alert"].map({1: "Yes", 0: "No"}).astype(object),
+        })
+
+    def query(self, start=None, end=None):
+        where, params = _range_clause(start, end)
+        return self._frame(f"SELECT timestamp, label, alert FROM detections{where} ORDER BY timestamp", params)
+
+    def recent(self, limit=10):
+        return self._frame(
+            "SELECT timestamp, label, alert FROM "
+            "(SELECT timestamp, label, alert FROM detections ORDER BY timestamp DESC LIMIT ?) "
+            "ORDER BY timestamp",
+            [limit],
+        )
+
+    def last_timestamp(self, label=None):
+        with self._conn() as conn:
+            if label is None:
+                row = conn.execute("SELECT MAX(timestamp) FROM detections").fetchone()
+            else:
+                row = conn.execute("SELECT MAX(timestamp) FROM detections WHERE label = ?", [label]).fetchone()
+        return pd.Timestamp(row[0]) if row[0] is not None else None
+
+    # --------------------------
+    # Migration bookkeeping
+    # --------------------------
+    def migrated_sources(self):
+        with self._conn() as conn:
+            return [row[0] for row in conn.execute("SELECT source FROM migrations")]
+
+    def mark_migrated(self, source):
+        with self._conn(write=True) as conn, conn:
+            conn.execute("INSERT OR IGNORE INTO migrations (source) VALUES (?)", [source])
@@ -0,0 +1,105 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("never", "batch", "interval")
+
+
+class DetectionSink:
+    """Buffered writer for the detection log.
+
+    ``write()`` only puts the row on an in-memory queue, so the frame loop
+    never touches the disk. A background thread hands queued rows to the
+    backend (``detection_store.DetectionStore`` or
+    ``detection_db.SqliteDetectionStore``) in batches once ``batch_size`` rows are waiting or ``flush_interval``
+    seconds have passed. Each stored batch is then passed to the
+    ``observers`` (e.g. ``stats.DetectionStats``) via ``record_batch``.
+
+    ``fsync`` controls durability: ``"never"`` leaves it to the OS,
+    ``"batch"`` fsyncs after every batch and ``"interval"`` at most once per
+    ``fsync_interval`` seconds. ``close()`` (also registered with
+    ``atexit``) drains the queue before returning.
+    """
+
+    def __init__(self, backend, batch_size=64, flush_interval=1.0, fsync="interval",
+                 fsync_interval=10.0, max_queue=10000, observers=()):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.backend = backend
+        self.observers = list(observers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        self._last_fsync = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="detection-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, timestamp, label, alert_triggered):
+        """Queue one detection row; never blocks the caller."""
+        if self._closed.is_set():
+            raise RuntimeError("DetectionSink is closed")
+        try:
+            self._queue.put_nowait((timestamp, label, alert_triggered))
+        except queue.Full:
+            # Losing a row beats stalling the camera loop on a wedged disk
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"Detection log queue full; dropped {self.dropped} rows so far")
+
+    def _take_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch, final=False):
+        now = time.monotonic()
+        fsync = self.fsync == "batch" or (
+            self.fsync == "interval" and (final or now - self._last_fsync >= self.fsync_interval)
+        )
+        self.backend.write_batch(batch, fsync=fsync)
+        if fsync:
+            self._last_fsync = now
+        self.written += len(batch)
+        for observer in self.observers:
+            try:
+                observer.record_batch(batch)
+            except Exception as e:
+                logger.error(f"Detection observer {type(observer).__name__} failed: {e}")
+
+    def _run(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if not batch:
+                continue
+            try:
+                self._flush(batch, final=self._closed.is_set() and self._queue.empty())
+            except OSError as e:
+                logger.error(f"Failed to write {len(batch)} detections: {e}")
+
+    def close(self):
+        """Stop accepting rows, write out everything queued and close the backend."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join()
+        self.backend.close()
+        for observer in self.observers:
+            observer.close()
@@ -0,0 +1,261 @@
+import csv
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# One raw little-endian file per column per day; appends never rewrite old data
+COLUMNS = {
+    "timestamp": np.dtype("<i8"),  # datetime64[ns] as int64
+    "label": np.dtype("<u2"),      # code into labels.json
+    "alert": np.dtype("u1"),       # 1 if an alert was triggered
+}
+PARTITION_FORMAT = "%Y-%m-%d"
+
+
+def _to_ns(timestamp):
+    return pd.Timestamp(timestamp).value
+
+
+class DetectionStore:
+    """Day-partitioned columnar detection log.
+
+    ``root/<YYYY-MM-DD>/`` holds ``timestamp.i8``, ``label.u2`` and
+    ``alert.u1``: fixed-width column files that are appended to and read back
+    with ``np.fromfile``. Labels are dictionary-encoded through
+    ``root/labels.json``. A time-range query only opens the partitions whose
+    day overlaps the range.
+    """
+
+    def __init__(self, root="detections"):
+        self.root = root
+        self.labels_path = os.path.join(root, "labels.json")
+        self.marker_path = os.path.join(root, "migrated.json")
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.labels = self._read_labels()
+        self._codes = {label: code for code, label in enumerate(self.labels)}
+
+    # --------------------------
+    # Label dictionary
+    # --------------------------
+    def _read_labels(self):
+        try:
+            with open(self.labels_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _code(self, label):
+        code = self._codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.labels.append(label)
+            self._codes[label] = code
+            tmp = self.labels_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.labels, f)
+            os.replace(tmp, self.labels_path)
+        return code
+
+    # --------------------------
+    # Writes
+    # --------------------------
+    def write_batch(self, rows, fsync=False):
+        """Append ``(timestamp, label, alert_triggered)`` rows.
+
+        ``alert_triggered`` may be a bool or the CSV's ``"Yes"``/``"No"``.
+        """
+        with self._lock:
+            by_day = {}
+            for timestamp, label, alert in rows:
+                ts = pd.Timestamp(timestamp)
+                if isinstance(alert, str):
+                    alert = alert == "Yes"
+                by_day.setdefault(ts.strftime(PARTITION_FORMAT), []).append((ts.value, self._code(label), bool(alert)))
+
+            for day, day_rows in by_day.items():
+                directory = os.path.join(self.root, day)
+                os.makedirs(directory, exist_ok=True)
+                values = list(zip(*day_rows))
+                for (column, dtype), column_values in zip(COLUMNS.items(), values):
+                    with open(os.path.join(directory, f"{column}.{dtype.kind}{dtype.itemsize}"), "ab") as f:
+                        np.asarray(column_values, dtype=dtype).tofile(f)
+                        if fsync:
+                            f.flush()
+                            os.fsync(f.fileno())
+
+    def close(self):
+        pass
+
+    # --------------------------
+    # Reads
+    # --------------------------
+    def partitions(self):
+        days = []
+        for entry in sorted(os.listdir(self.root)):
+            try:
+                days.append(datetime.strptime(entry, PARTITION_FORMAT))
+            except ValueError:
+                continue
+        return days
+
+    def _read_partition(self, day):
+        directory = os.path.join(self.root, day.strftime(PARTITION_FORMAT))
+        columns = {}
+        for column, dtype in COLUMNS.items():
+            path = os.path.join(directory, f"{column}.{dtype.kind}{dtype.itemsize}")
+            columns[column] = np.fromfile(path, dtype=dtype) if os.path.exists(path) else np.empty(0, dtype)
+        # A crash between column appends can leave one column a row ahead
+        length = min(len(values) for values in columns.values())
+        return {column: values[:length] for column, values in columns.items()}
+
+    def scan(self, start=None, end=None):
+        """Raw column arrays for ``start <= timestamp < end``."""
+        start_ns = _to_ns(start) if start is not None else None
+        end_ns = _to_ns(end) if end is not None else None
+        first_day = pd.Timestamp(start).normalize() if start is not None else None
+        parts = []
+        for day in self.partitions():
+            if first_day is not None and day < first_day:
+                continue
+            if end is not None and day >= pd.Timestamp(end):
+                break
+            columns = self._read_partition(day)
+            mask = np.ones(len(columns["timestamp"]), dtype=bool)
+            if start_ns is not None:
+                mask &= columns["timestamp"] >= start_ns
+            if end_ns is not None:
+                mask &= columns["timestamp"] < end_ns
+            parts.append({column: values[mask] for column, values in columns.items()})
+        if not parts:
+            return {column: np.empty(0, dtype) for column, dtype in COLUMNS.items()}
+        return {column: np.concatenate([part[column] for part in parts]) for column in COLUMNS}
+
+    def query(self, start=None, end=None):
+        """Detections in ``[start, end)`` as the dashboard's DataFrame layout."""
+        return self._to_frame(self.scan(start, end))
+
+    def _refresh_labels(self, codes=None):
+        # Another process may have added labels since we loaded the dictionary
+        if codes is None or (len(codes) and codes.max() >= len(self.labels)):
+            self.labels = self._read_labels()
+            self._codes = {label: code for code, label in enumerate(self.labels)}
+
+    def _to_frame(self, columns):
+        self._refresh_labels(columns["label"])
+        labels = pd.Categorical.from_codes(columns["label"].astype(np.int64), categories=self.labels) \
+            if len(self.labels) else pd.Categorical([])
+        return pd.DataFrame({
+            "timestamp": pd.to_datetime(columns["timestamp"], unit="ns"),
+            "label": labels,
+            "alert_triggered": np.where(columns["alert"].astype(bool), "Yes", "No"),
+        })
+
+    def last_timestamp(self, label=None):
+        """Most recent detection (of ``label``, if given), reading newest partitions first."""
+        code = None
+        if label is not None:
+            if label not in self._codes:
+                self._refresh_labels()
+            code = self._codes.get(label)
+            if code is None:
+                return None
+        for day in reversed(self.partitions()):
+            columns = self._read_partition(day)
+            hits = columns["timestamp"] if code is None else columns["timestamp"][columns["label"] == code]
+            if len(hits):
+                return pd.Timestamp(int(hits.max()))
+        return None
+
+    def recent(self, limit=10):
+        """The ``limit`` most recent detections, oldest first."""
+        frames = []
+        remaining = limit
+        for day in reversed(self.partitions()):
+            if remaining <= 0:
+                break
+            part = self.query(start=day, end=day + pd.Timedelta(days=1))
+            frames.insert(0, part.tail(remaining))
+            remaining -= len(frames[0])
+        if not frames:
+            return self._to_frame({column: np.empty(0, dtype) for column, dtype in COLUMNS.items()})
+        return pd.concat(frames, ignore_index=True)
+
+    # --------------------------
+    # Migration bookkeeping
+    # --------------------------
+    def migrated_sources(self):
+        try:
+            with open(self.marker_path) as f:
+                return json.load(f).get("sources", [])
+        except FileNotFoundError:
+            return []
+
+    def mark_migrated(self, source):
+        sources = self.migrated_sources() + [source]
+        with open(self.marker_path, "w") as f:
+            json.dump({"sources": sources}, f)
+
+
+# --------------------------
+# Legacy CSV import
+# --------------------------
+# Test rows at the top of the shipped detections.csv; nobody is called that
+LEGACY_TEST_LABELS = ("placeholder",)
+
+
+def read_legacy_csv(csv_path, skip_labels=()):
+    """Yield ``(timestamp, label, alert)`` rows from a legacy ``detections.csv``.
+
+    Rows are read positionally, so both the 3-column rows the app writes
+    (timestamp, label, alert_triggered) and rows under the old 4-column
+    header (timestamp, label, confidence, alert_triggered) line up. Rows with
+    an unparseable timestamp are skipped.
+    """
+    with open(csv_path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 3 or row[0] == "timestamp":
+                continue
+            timestamp, label, alert = row[0], row[1], row[-1]
+            if label in skip_labels:
+                continue
+            try:
+                timestamp = datetime.fromisoformat(timestamp.strip())
+            except ValueError:
+                logger.warning(f"Skipping detection with unparseable timestamp: {row}")
+                continue
+            yield timestamp, label, alert.strip() == "Yes"
+
+
+def migrate_csv(store, csv_path, skip_labels=(), batch_size=100000):
+    """One-time import of ``csv_path`` into ``store`` (any detection backend).
+
+    Returns the number of rows imported, or None if it was already migrated.
+    """
+    source = os.path.abspath(csv_path)
+    if source in store.migrated_sources():
+        return None
+    if not os.path.exists(csv_path):
+        return 0
+
+    imported = 0
+    batch = []
+    for row in read_legacy_csv(csv_path, skip_labels):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            store.write_batch(batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        store.write_batch(batch)
+        imported += len(batch)
+    store.mark_migrated(source)
+    logger.info(f"Migrated {imported} detections from {csv_path}")
+    return imported
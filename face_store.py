@@ -0,0 +1,224 @@
+import hashlib
+import json
+import logging
+import os
+from collections import namedtuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+ENCODING_SIZE = 128
+
+IdentityTemplate = namedtuple("IdentityTemplate", ["name", "vectors", "threshold", "n_samples", "spread"])
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_encoder(path):
+    # Imported lazily so the store can be inspected without dlib installed
+    import face_recognition
+
+    image = face_recognition.load_image_file(path)
+    encodings = face_recognition.face_encodings(image)
+    return encodings[0] if encodings else None
+
+
+class EncodingStore:
+    """On-disk cache of known-face encodings.
+
+    Encodings live in ``encodings.npy`` (memory-mapped on load) next to a
+    ``manifest.json`` that records, per image, its content hash, mtime, size,
+    label and row in the array. Only images that were added or changed since
+    the last run are re-encoded.
+    """
+
+    def __init__(self, faces_dir="known_faces", cache_dir="face_cache", encoder=default_encoder):
+        self.faces_dir = faces_dir
+        self.cache_dir = cache_dir
+        self.encoder = encoder
+        self.encodings_path = os.path.join(cache_dir, "encodings.npy")
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+
+    # --------------------------
+    # Manifest I/O
+    # --------------------------
+    def _read_cache(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            encodings = np.load(self.encodings_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.manifest_path):
+                logger.warning(f"Discarding unreadable face cache: {e}")
+            return {}, np.empty((0, ENCODING_SIZE))
+        return manifest.get("files", {}), encodings
+
+    def _write_cache(self, files, encodings):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_encodings = self.encodings_path + ".tmp.npy"
+        tmp_manifest = self.manifest_path + ".tmp"
+        np.save(tmp_encodings, encodings)
+        with open(tmp_manifest, "w") as f:
+            json.dump({"version": 1, "files": files}, f, indent=1, sort_keys=True)
+        # Replace the array first: a stale manifest pointing at a newer array
+        # is detected by the row bounds check on the next load.
+        os.replace(tmp_encodings, self.encodings_path)
+        os.replace(tmp_manifest, self.manifest_path)
+
+    # --------------------------
+    # Directory scan
+    # --------------------------
+    def _scan(self):
+        # known_faces/<person>/*.jpg, plus loose known_faces/<person>.jpg files
+        # for galleries that still use the flat layout
+        images = []
+        if not os.path.isdir(self.faces_dir):
+            return images
+        for entry in sorted(os.listdir(self.faces_dir)):
+            path = os.path.join(self.faces_dir, entry)
+            if os.path.isdir(path):
+                for file in sorted(os.listdir(path)):
+                    if os.path.isfile(os.path.join(path, file)) and file.lower().endswith(IMAGE_EXTENSIONS):
+                        images.append((f"{entry}/{file}", os.path.join(path, file), entry))
+            elif os.path.isfile(path) and entry.lower().endswith(IMAGE_EXTENSIONS):
+                images.append((entry, path, entry.split('.')[0]))
+        return images
+
+    def load(self):
+        """Return ``(encodings, labels, missing)`` for the faces directory.
+
+        ``encodings`` is an ``(N, 128)`` array, ``labels`` the matching names
+        and ``missing`` the image files in which no face could be found.
+        """
+        cached_files, cached_encodings = self._read_cache()
+        by_hash = {entry["sha1"]: entry for entry in cached_files.values()}
+
+        files = {}
+        rows = []
+        labels = []
+        missing = []
+        changed = False
+
+        for rel_path, path, label in self._scan():
+            stat = os.stat(path)
+            entry = cached_files.get(rel_path)
+            if entry is None or entry["mtime"] != stat.st_mtime or entry["size"] != stat.st_size:
+                # Stat changed (or new file): fall back to the content hash,
+                # which also catches renames and touched-but-identical files.
+                sha1 = file_sha1(path)
+                entry = by_hash.get(sha1)
+                changed = True
+            else:
+                sha1 = entry["sha1"]
+
+            encoding = None
+            row = entry.get("row") if entry is not None else None
+            if entry is not None and entry["sha1"] == sha1 and (row is None or row < len(cached_encodings)):
+                # Copy out of the memmap so it can be released before the cache is rewritten
+                encoding = None if row is None else np.array(cached_encodings[row])
+                no_face = row is None
+            else:
+                logger.info(f"Encoding known face: {rel_path}")
+                encoding = self.encoder(path)
+                no_face = encoding is None
+                changed = True
+
+            record = {"sha1": sha1, "mtime": stat.st_mtime, "size": stat.st_size, "label": label, "row": None}
+            if no_face:
+                missing.append(rel_path)
+            else:
+                record["row"] = len(rows)
+                rows.append(np.asarray(encoding, dtype=np.float64))
+                labels.append(label)
+            files[rel_path] = record
+
+        if set(files) != set(cached_files):
+            changed = True
+        # Windows cannot replace encodings.npy while it is still mapped
+        del cached_encodings
+
+        encodings = np.vstack(rows) if rows else np.empty((0, ENCODING_SIZE))
+        if changed:
+            self._write_cache(files, encodings)
+        return encodings, labels, missing
+
+
+# --------------------------
+# Identity templates
+# --------------------------
+def _distances(a, b):
+    return np.linalg.norm(a[:, None, :] - b[None, :, :], axis=2)
+
+
+def _medoids(samples, k, n_iter=5):
+    """Pick ``k`` representative samples (k-medoids, farthest-point seeded)."""
+    if len(samples) <= k:
+        return samples.copy()
+    pairwise = _distances(samples, samples)
+    chosen = [int(np.argmin(pairwise.sum(axis=1)))]
+    while len(chosen) < k:
+        chosen.append(int(np.argmax(pairwise[:, chosen].min(axis=1))))
+    for _ in range(n_iter):
+        assign = np.argmin(pairwise[:, chosen], axis=1)
+        updated = []
+        for cluster in range(k):
+            members = np.flatnonzero(assign == cluster)
+            if not len(members):
+                updated.append(chosen[cluster])
+                continue
+            within = pairwise[np.ix_(members, members)].sum(axis=1)
+            updated.append(int(members[np.argmin(within)]))
+        if updated == chosen:
+            break
+        chosen = updated
+    return samples[chosen]
+
+
+def _template_vectors(samples, max_medoids):
+    if len(samples) == 1:
+        return samples
+    return np.vstack([samples.mean(axis=0, keepdims=True), _medoids(samples, max_medoids)])
+
+
+def build_templates(encodings, labels, max_medoids=3, tolerance=0.6, min_tolerance=0.45, max_tolerance=0.65, slack=0.3):
+    """Aggregate per-photo encodings into one template per identity.
+
+    Each template holds the centroid plus up to ``max_medoids`` medoids, so
+    matching cost scales with people rather than photos. The per-person
+    threshold starts from ``tolerance`` and, once there are more samples than
+    medoids, follows the identity's spread: the 90th-percentile leave-one-out
+    distance (each sample against the template built without it) plus
+    ``slack``, clamped to ``[min_tolerance, max_tolerance]``. Measured against
+    its own template a medoid is always at distance 0, which would make the
+    threshold too strict.
+    """
+    grouped = {}
+    for label, encoding in zip(labels, encodings):
+        grouped.setdefault(label, []).append(encoding)
+
+    templates = []
+    for name, samples in grouped.items():
+        samples = np.asarray(samples, dtype=np.float64)
+        vectors = _template_vectors(samples, max_medoids)
+        if len(samples) > 1:
+            held_out = [
+                _distances(samples[i:i + 1], _template_vectors(np.delete(samples, i, axis=0), max_medoids)).min()
+                for i in range(len(samples))
+            ]
+            spread = float(np.percentile(held_out, 90))
+        else:
+            spread = 0.0
+        if len(samples) > max_medoids:
+            threshold = float(np.clip(spread + slack, min_tolerance, max_tolerance))
+        else:
+            threshold = tolerance
+        templates.append(IdentityTemplate(name, vectors, threshold, len(samples), spread))
+    return templates
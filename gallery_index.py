@@ -0,0 +1,239 @@
+import argparse
+import time
+
+import numpy as np
+
+DIM = 128
+# Galleries at or above this size get an IVF index instead of brute force
+ANN_THRESHOLD = 2000
+
+
+def _sq_norms(vectors):
+    return np.einsum("ij,ij->i", vectors, vectors)
+
+
+def _pairwise_distances(queries, vectors, vector_sq_norms=None):
+    if vector_sq_norms is None:
+        vector_sq_norms = _sq_norms(vectors)
+    sq = _sq_norms(queries)[:, None] + vector_sq_norms[None, :] - 2.0 * (queries @ vectors.T)
+    # Rounding can push identical vectors slightly below zero
+    return np.sqrt(np.maximum(sq, 0.0))
+
+
+def _as_matrix(vectors):
+    return np.ascontiguousarray(np.asarray(vectors, dtype=np.float32).reshape(-1, DIM))
+
+
+def _top_k(ids, dist, k):
+    """Pick the k smallest distances per row, padding with -1 / inf."""
+    n_queries, n = dist.shape
+    out_ids = np.full((n_queries, k), -1, dtype=np.int64)
+    out_dist = np.full((n_queries, k), np.inf, dtype=np.float32)
+    if n == 0:
+        return out_ids, out_dist
+    kk = min(k, n)
+    part = np.argpartition(dist, kk - 1, axis=1)[:, :kk] if n > kk else np.tile(np.arange(n), (n_queries, 1))
+    part_dist = np.take_along_axis(dist, part, axis=1)
+    order = np.argsort(part_dist, axis=1)
+    part = np.take_along_axis(part, order, axis=1)
+    out_ids[:, :kk] = ids[part]
+    out_dist[:, :kk] = np.take_along_axis(part_dist, order, axis=1)
+    return out_ids, out_dist
+
+
+# --------------------------
+# Exact index
+# --------------------------
+class BruteForceIndex:
+    """Exact linear scan over a contiguous float32 matrix."""
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, DIM), dtype=np.float32)
+        self.sq_norms = np.empty(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids, vectors):
+        vectors = _as_matrix(vectors)
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.vectors = np.ascontiguousarray(np.vstack([self.vectors, vectors]))
+        self.sq_norms = np.concatenate([self.sq_norms, _sq_norms(vectors)])
+
+    def remove(self, ids):
+        keep = ~np.isin(self.ids, np.asarray(list(ids), dtype=np.int64))
+        self.ids = self.ids[keep]
+        self.vectors = np.ascontiguousarray(self.vectors[keep])
+        self.sq_norms = self.sq_norms[keep]
+
+    def search(self, queries, k=2):
+        """Return ``(ids, distances)``, each of shape ``(len(queries), k)``."""
+        queries = _as_matrix(queries)
+        dist = _pairwise_distances(queries, self.vectors, self.sq_norms)
+        return _top_k(self.ids, dist, k)
+
+
+# --------------------------
+# Approximate index
+# --------------------------
+class IVFIndex:
+    """Inverted-file index: k-means coarse quantiser plus exact re-ranking.
+
+    Each vector is filed under its nearest centroid. A search only scans the
+    ``n_probe`` lists whose centroids are closest to the query, so cost grows
+    with ``n_probe * N / n_lists`` instead of ``N``. Raising ``n_probe`` trades
+    speed for recall; use ``measure_recall`` to tune it.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids = np.empty((0, DIM), dtype=np.float32)
+        self.lists = []
+        self.trained_size = 0
+        self._where = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    def train(self, vectors):
+        vectors = _as_matrix(vectors)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assign = np.argmin(_pairwise_distances(vectors, centroids), axis=1)
+            for c in range(n_lists):
+                members = vectors[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+        self.centroids = centroids
+        self.trained_size = len(vectors)
+
+    def rebuild(self, ids, vectors):
+        """Retrain the centroids on ``vectors`` and re-file everything."""
+        self.train(vectors)
+        self.lists = [(np.empty(0, dtype=np.int64), np.empty((0, DIM), dtype=np.float32)) for _ in self.centroids]
+        self._where = {}
+        self.add(ids, vectors)
+
+    def add(self, ids, vectors):
+        if not len(self.centroids):
+            raise RuntimeError("IVFIndex must be trained before vectors are added")
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = _as_matrix(vectors)
+        if not len(ids):
+            return
+        assign = np.argmin(_pairwise_distances(vectors, self.centroids), axis=1)
+        for c in np.unique(assign):
+            mask = assign == c
+            list_ids, list_vectors = self.lists[c]
+            self.lists[c] = (np.concatenate([list_ids, ids[mask]]), np.vstack([list_vectors, vectors[mask]]))
+            for i in ids[mask]:
+                self._where[int(i)] = int(c)
+
+    def remove(self, ids):
+        by_list = {}
+        for i in ids:
+            c = self._where.pop(int(i), None)
+            if c is not None:
+                by_list.setdefault(c, []).append(int(i))
+        for c, dropped in by_list.items():
+            list_ids, list_vectors = self.lists[c]
+            keep = ~np.isin(list_ids, dropped)
+            self.lists[c] = (list_ids[keep], list_vectors[keep])
+
+    def search(self, queries, k=2):
+        """Return ``(ids, distances)``, each of shape ``(len(queries), k)``."""
+        queries = _as_matrix(queries)
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        out_dist = np.full((len(queries), k), np.inf, dtype=np.float32)
+        if not len(self):
+            return out_ids, out_dist
+        n_probe = min(self.n_probe, len(self.centroids))
+        coarse = _pairwise_distances(queries, self.centroids)
+        probes = np.argpartition(coarse, n_probe - 1, axis=1)[:, :n_probe]
+        for q, lists in enumerate(probes):
+            cand_ids = np.concatenate([self.lists[c][0] for c in lists])
+            if not len(cand_ids):
+                continue
+            cand_vectors = np.vstack([self.lists[c][1] for c in lists])
+            dist = _pairwise_distances(queries[q:q + 1], cand_vectors)
+            out_ids[q], out_dist[q] = (a[0] for a in _top_k(cand_ids, dist, k))
+        return out_ids, out_dist
+
+
+def make_index(ids, vectors, ann_threshold=ANN_THRESHOLD, **ivf_options):
+    """Brute force for small galleries, IVF once ``ann_threshold`` is reached."""
+    if len(ids) >= ann_threshold:
+        index = IVFIndex(**ivf_options)
+        index.rebuild(ids, vectors)
+    else:
+        index = BruteForceIndex()
+        index.add(ids, vectors)
+    return index
+
+
+def measure_recall(index, reference, queries, k=1):
+    """Fraction of the exact top-k neighbours that ``index`` also returns."""
+    approx_ids, _ = index.search(queries, k)
+    exact_ids, _ = reference.search(queries, k)
+    hits = 0
+    total = 0
+    for found, expected in zip(approx_ids, exact_ids):
+        expected = expected[expected >= 0]
+        hits += len(np.intersect1d(found, expected))
+        total += len(expected)
+    return hits / total if total else 1.0
+
+
+# --------------------------
+# Tuning CLI
+# --------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Report IVF recall and speed against exact search.")
+    parser.add_argument("--faces-dir", default="known_faces")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random encodings instead of known_faces")
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.05, help="Std-dev of noise added to gallery vectors to form queries")
+    parser.add_argument("-k", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        vectors = rng.normal(0, 0.1, size=(args.synthetic, DIM)).astype(np.float32)
+    else:
+        from face_store import EncodingStore
+        vectors = EncodingStore(args.faces_dir).load()[0].astype(np.float32)
+    if not len(vectors):
+        parser.error("gallery is empty")
+    ids = np.arange(len(vectors))
+    picks = rng.integers(0, len(vectors), size=args.queries)
+    queries = vectors[picks] + rng.normal(0, args.noise, size=(args.queries, DIM)).astype(np.float32)
+
+    exact = BruteForceIndex()
+    exact.add(ids, vectors)
+    start = time.perf_counter()
+    exact.search(queries, args.k)
+    exact_ms = (time.perf_counter() - start) * 1000 / args.queries
+    print(f"gallery={len(vectors)} exact: {exact_ms:.3f} ms/query")
+
+    ivf = IVFIndex(n_lists=args.n_lists)
+    ivf.rebuild(ids, vectors)
+    for n_probe in args.n_probe:
+        ivf.n_probe = n_probe
+        start = time.perf_counter()
+        ivf.search(queries, args.k)
+        ivf_ms = (time.perf_counter() - start) * 1000 / args.queries
+        recall = measure_recall(ivf, exact, queries, args.k)
+        print(f"n_lists={len(ivf.centroids)} n_probe={n_probe}: recall@{args.k}={recall:.3f} {ivf_ms:.3f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import logging
+from datetime import datetime
+
+import cv2
+
+from alerts import Alert
+from matcher import UNKNOWN
+from quality import crop_face
+
+logger = logging.getLogger(__name__)
+
+
+def crop_score(crop):
+    # Bigger and sharper is better; Laplacian variance drops sharply with motion blur
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return gray.shape[0] * gray.shape[1] * cv2.Laplacian(gray, cv2.CV_64F).var()
+
+
+class _Candidate:
+    __slots__ = ("camera", "first_seen", "frames", "score", "crop")
+
+    def __init__(self, camera, first_seen):
+        self.camera = camera
+        self.first_seen = first_seen
+        self.frames = 0
+        self.score = -1.0
+        self.crop = None
+
+
+class IntrusionAlerter:
+    """Turns "Unknown" recognition results into WhatsApp alerts.
+
+    Each confirmed unknown track is watched for up to ``collect_frames``
+    results or ``collect_window`` seconds, keeping its best crop (largest
+    and sharpest). The crop is then JPEG-encoded in memory and handed to the
+    ``alerts.AlertDispatcher``. A candidate whose track turns out to be a
+    known person is dropped. After an alert its camera is quiet for
+    ``cooldown`` seconds whatever track the next unknown face is on: a
+    person standing still is only re-detected at the motion gate's idle
+    check, long after their old track expired. Alerts share one coalescing
+    key, so several intruders arriving together produce one message.
+    """
+
+    def __init__(self, dispatcher, cooldown=120.0, collect_frames=3, collect_window=2.0,
+                 jpeg_quality=80, padding=0.3):
+        self.dispatcher = dispatcher
+        self.collect_frames = collect_frames
+        self.collect_window = collect_window
+        self.jpeg_quality = jpeg_quality
+        self.cooldown = cooldown
+        self.padding = padding
+        self.sent = 0
+        # camera -> when its last alert was sent
+        self._last_alert = {}
+        # (camera, track id) -> _Candidate
+        self._candidates = {}
+
+    def observe(self, result, image=None):
+        """Feed one ``RecognitionResult``.
+
+        Faces carry their own ``crop`` when they come from a
+        ``RecognitionPipeline``; otherwise they are cropped from ``image``,
+        the BGR frame the result came from, if given.
+        """
+        for face in result.faces:
+            key = (result.camera, face.track_id)
+            if face.name != UNKNOWN:
+                if face.name is not None and face.track_id is not None:
+                    # The track resolved to someone known
+                    self._candidates.pop(key, None)
+                continue
+            if not face.confirmed:
+                # One bad first crop must not raise an alert
+                continue
+            candidate = self._candidates.get(key)
+            if candidate is None:
+                if result.timestamp - self._last_alert.get(result.camera, float("-inf")) < self.cooldown:
+                    continue
+                candidate = self._candidates[key] = _Candidate(result.camera, result.timestamp)
+            candidate.frames += 1
+            crop = face.crop
+            if crop is None and image is not None:
+                crop = crop_face(image, face.box, self.padding)
+            if crop is not None:
+                score = crop_score(crop)
+                if score > candidate.score:
+                    candidate.score, candidate.crop = score, crop
+        self.flush(result.timestamp)
+
+    def flush(self, now, force=False):
+        """Send every candidate that has collected enough frames or waited long enough."""
+        for key, candidate in list(self._candidates.items()):
+            if force or candidate.frames >= self.collect_frames or now - candidate.first_seen >= self.collect_window:
+                del self._candidates[key]
+                self._last_alert[candidate.camera] = now
+                self._send(candidate)
+
+    def _send(self, candidate):
+        seen_at = datetime.fromtimestamp(candidate.first_seen)
+        text = f"Intruder alert: unknown person at {seen_at.strftime('%H:%M:%S')}"
+        jpeg = None
+        if candidate.crop is not None:
+            ok, encoded = cv2.imencode(".jpg", candidate.crop, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if ok:
+                jpeg = encoded.tobytes()
+            else:
+                logger.warning("Failed to encode intruder snapshot; sending text only")
+        filename = f"intruder_{seen_at.strftime('%Y%m%d_%H%M%S')}.jpg"
+        self.dispatcher.submit(Alert(text, jpeg, filename, key="intrusion"))
+        self.sent += 1
+
+    def reset(self):
+        self._candidates.clear()
+        self._last_alert.clear()
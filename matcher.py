@@ -0,0 +1,139 @@
+import hashlib
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from gallery_index import ANN_THRESHOLD, BruteForceIndex, IVFIndex, make_index
+
+UNKNOWN = "Unknown"
+
+MatchResult = namedtuple("MatchResult", ["name", "index", "distance", "margin"])
+
+
+def _entry_key(name, encoding):
+    return hashlib.sha1(name.encode() + np.asarray(encoding, dtype=np.float32).tobytes()).hexdigest()
+
+
+class FaceMatcher:
+    """Nearest-identity matcher over the known-face gallery.
+
+    The gallery lives in a pluggable index (see ``gallery_index``): an exact
+    brute-force scan over one contiguous float32 matrix for small galleries,
+    and an IVF index once it reaches ``ann_threshold`` entries. All faces in a
+    frame are scored in one batched search. Several entries may share a name
+    (an identity template's centroid and medoids); results are per identity.
+    """
+
+    def __init__(self, encodings, names, tolerance=0.6, ann_threshold=ANN_THRESHOLD, **ivf_options):
+        self.tolerance = tolerance
+        self.ann_threshold = ann_threshold
+        self.ivf_options = ivf_options
+        self.names = {}
+        self.thresholds = {}
+        self._rows_per_name = 1
+        self._keys = {}
+        self._next_id = 0
+        self.index = BruteForceIndex()
+        self.sync(encodings, names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def sync_templates(self, templates):
+        """Load ``face_store.IdentityTemplate``s: one row per template vector."""
+        encodings, names, thresholds = [], [], []
+        for template in templates:
+            for vector in template.vectors:
+                encodings.append(vector)
+                names.append(template.name)
+                thresholds.append(template.threshold)
+        self.sync(encodings, names, thresholds)
+
+    def sync(self, encodings, names, thresholds=None):
+        """Bring the gallery in line with ``encodings``/``names``.
+
+        Only entries that were added or removed since the last call touch the
+        index, so refreshing after a change to ``known_faces/`` is cheap.
+        ``thresholds`` optionally overrides ``tolerance`` per entry.
+        """
+        if thresholds is None:
+            thresholds = [self.tolerance] * len(names)
+        wanted = {}
+        for name, encoding, threshold in zip(names, encodings, thresholds):
+            wanted[_entry_key(name, encoding)] = (name, encoding, threshold)
+
+        removed = [self._keys.pop(key) for key in list(self._keys) if key not in wanted]
+        for entry_id in removed:
+            del self.names[entry_id]
+            del self.thresholds[entry_id]
+        for key, entry_id in self._keys.items():
+            self.thresholds[entry_id] = wanted[key][2]
+        added = [(key, entry) for key, entry in wanted.items() if key not in self._keys]
+        ids = list(range(self._next_id, self._next_id + len(added)))
+        self._next_id += len(added)
+        for entry_id, (key, (name, _, threshold)) in zip(ids, added):
+            self._keys[key] = entry_id
+            self.names[entry_id] = name
+            self.thresholds[entry_id] = threshold
+        vectors = [encoding for _, (_, encoding, _) in added]
+        self._rows_per_name = max(Counter(self.names.values()).values(), default=1)
+
+        if removed:
+            self.index.remove(removed)
+        wants_ann = len(self) >= self.ann_threshold
+        is_ann = isinstance(self.index, IVFIndex)
+        if wants_ann != is_ann or (is_ann and len(self) > 4 * max(self.index.trained_size, 1)):
+            self._rebuild(ids, vectors)
+        elif ids:
+            self.index.add(ids, vectors)
+
+    def _rebuild(self, new_ids, new_vectors):
+        # Recover existing vectors from the current index rather than keeping a second copy
+        fresh = set(new_ids)
+        old_ids = [i for i in self.names if i not in fresh]
+        ids = old_ids + list(new_ids)
+        vectors = np.empty((0, 128), dtype=np.float32)
+        if old_ids:
+            vectors = np.vstack([vectors, self._vectors(old_ids)])
+        if len(new_vectors):
+            vectors = np.vstack([vectors, np.asarray(new_vectors, dtype=np.float32)])
+        self.index = make_index(ids, vectors, self.ann_threshold, **self.ivf_options)
+
+    def _vectors(self, ids):
+        if isinstance(self.index, BruteForceIndex):
+            lookup = dict(zip(self.index.ids.tolist(), self.index.vectors))
+        else:
+            lookup = {}
+            for list_ids, list_vectors in self.index.lists:
+                lookup.update(zip(list_ids.tolist(), list_vectors))
+        return np.vstack([lookup[i] for i in ids])
+
+    def match(self, face_encodings):
+        """Return one ``MatchResult`` per face encoding.
+
+        ``margin`` is the distance gap to the closest entry of a *different*
+        identity (``inf`` when there is none); faces farther than the matched
+        entry's threshold are labelled ``Unknown`` with ``index`` set to -1.
+        """
+        if len(face_encodings) == 0:
+            return []
+        if len(self) == 0:
+            return [MatchResult(UNKNOWN, -1, float("inf"), float("inf")) for _ in face_encodings]
+
+        # Enough neighbours that the runner-up identity is always among them
+        ids, dist = self.index.search(face_encodings, k=self._rows_per_name + 1)
+        results = []
+        for row_ids, row_dist in zip(ids, dist):
+            best = int(row_ids[0])
+            distance = float(row_dist[0])
+            second = float("inf")
+            for other, other_dist in zip(row_ids[1:], row_dist[1:]):
+                if other >= 0 and self.names[int(other)] != self.names.get(best):
+                    second = float(other_dist)
+                    break
+            margin = second - distance
+            if best >= 0 and distance <= self.thresholds[best]:
+                results.append(MatchResult(self.names[best], best, distance, margin))
+            else:
+                results.append(MatchResult(UNKNOWN, -1, distance, margin))
+        return results
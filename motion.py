@@ -0,0 +1,82 @@
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# ``rois`` are (x, y, w, h) boxes in full-frame pixel coordinates
+MotionResult = namedtuple("MotionResult", ["moving", "score", "rois"])
+
+
+class MotionGate:
+    """Cheap motion detector that decides whether the face detector should run.
+
+    Frames are shrunk to ``width`` pixels wide, converted to grayscale and
+    blurred, then compared against a running-average background. Pixels that
+    differ by more than ``threshold`` are grouped into regions; regions
+    smaller than ``min_area`` (fraction of the frame) are ignored as noise.
+    """
+
+    def __init__(self, width=160, threshold=25, min_area=0.002, learning_rate=0.05, padding=0.25):
+        self.width = width
+        self.threshold = threshold
+        self.min_area = min_area
+        self.learning_rate = learning_rate
+        self.padding = padding
+        self.background = None
+
+    def reset(self):
+        self.background = None
+
+    def update(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.width / width
+        small = cv2.resize(frame, (self.width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            return MotionResult(False, 0.0, [])
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+        _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=2)
+        score = float(np.count_nonzero(mask)) / mask.size
+        if score < self.min_area:
+            return MotionResult(False, score, [])
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_pixels = self.min_area * mask.size
+        rois = []
+        for contour in contours:
+            if cv2.contourArea(contour) < min_pixels:
+                continue
+            x, y, w, h = cv2.boundingRect(contour)
+            # Pad so a face at the edge of the moving region is still fully inside it
+            pad_x, pad_y = int(w * self.padding), int(h * self.padding)
+            x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+            x1, y1 = min(mask.shape[1], x + w + pad_x), min(mask.shape[0], y + h + pad_y)
+            rois.append((int(x0 / scale), int(y0 / scale), int((x1 - x0) / scale), int((y1 - y0) / scale)))
+        return MotionResult(bool(rois), score, merge_rois(rois))
+
+
+def merge_rois(rois):
+    """Merge overlapping (x, y, w, h) boxes until none overlap; empty boxes are dropped."""
+    boxes = [list(roi) for roi in rois if roi[2] > 0 and roi[3] > 0]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                ax, ay, aw, ah = boxes[i]
+                bx, by, bw, bh = boxes[j]
+                if ax <= bx + bw and bx <= ax + aw and ay <= by + bh and by <= ay + ah:
+                    x0, y0 = min(ax, bx), min(ay, by)
+                    x1, y1 = max(ax + aw, bx + bw), max(ay + ah, by + bh)
+                    boxes[i] = [x0, y0, x1 - x0, y1 - y0]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return [tuple(box) for box in boxes]
@@ -0,0 +1,86 @@
+from collections import namedtuple
+
+import cv2
+
+# ``size`` is the shorter box side in the pixels the encoder sees; ``yaw`` is
+# the nose's offset from the middle of the eyes in inter-eye distances (0 is
+# frontal, about 0.5 is a half profile); ``score`` (0..1) ranks crops
+FaceQuality = namedtuple("FaceQuality", ["size", "sharpness", "brightness", "contrast", "yaw", "score"])
+
+
+def crop_face(image, box, padding=0.3):
+    """Copy of ``box`` (top, right, bottom, left) grown by ``padding`` on each side."""
+    top, right, bottom, left = box
+    pad_y = int((bottom - top) * padding)
+    pad_x = int((right - left) * padding)
+    height, width = image.shape[:2]
+    top, bottom = max(0, top - pad_y), min(height, bottom + pad_y)
+    left, right = max(0, left - pad_x), min(width, right + pad_x)
+    if bottom <= top or right <= left:
+        return None
+    return image[top:bottom, left:right].copy()
+
+
+def estimate_yaw(shape):
+    """Head turn from a 5-point dlib landmark ``shape`` (two points per eye, then the nose)."""
+    points = [(shape.part(i).x, shape.part(i).y) for i in range(5)]
+    eye_a = ((points[0][0] + points[1][0]) / 2, (points[0][1] + points[1][1]) / 2)
+    eye_b = ((points[2][0] + points[3][0]) / 2, (points[2][1] + points[3][1]) / 2)
+    inter_eye = ((eye_a[0] - eye_b[0]) ** 2 + (eye_a[1] - eye_b[1]) ** 2) ** 0.5
+    if inter_eye == 0:
+        return 0.0
+    return (points[4][0] - (eye_a[0] + eye_b[0]) / 2) / inter_eye
+
+
+def assess_face(gray, location, shape=None):
+    """Cheap quality measures of the face at ``location`` (top, right, bottom, left) in ``gray``."""
+    top, right, bottom, left = location
+    crop = gray[max(0, top):bottom, max(0, left):right]
+    if crop.size == 0:
+        return FaceQuality(0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    size = min(crop.shape[:2])
+    # Laplacian variance drops sharply with motion blur and defocus
+    sharpness = float(cv2.Laplacian(crop, cv2.CV_64F).var())
+    brightness = float(crop.mean())
+    contrast = float(crop.std())
+    yaw = estimate_yaw(shape) if shape is not None else 0.0
+    score = (
+        min(1.0, size / 100.0)
+        * min(1.0, sharpness / 100.0)
+        * max(0.0, 1.0 - abs(brightness - 128.0) / 128.0)
+        * min(1.0, contrast / 40.0)
+        * max(0.0, 1.0 - abs(yaw))
+    )
+    return FaceQuality(size, sharpness, brightness, contrast, yaw, score)
+
+
+class QualityGate:
+    """Thresholds below which a face crop is not worth encoding.
+
+    Tiny, blurred, badly exposed and strongly turned faces give encodings
+    that match nobody, which shows up as spurious "Unknown" detections.
+    ``min_size`` is in encoder pixels; HOG finds faces down to about 40.
+    """
+
+    def __init__(self, min_size=48, min_sharpness=20.0, min_brightness=40.0, max_brightness=220.0,
+                 min_contrast=12.0, max_yaw=0.45):
+        self.min_size = min_size
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.min_contrast = min_contrast
+        self.max_yaw = max_yaw
+
+    def check(self, quality):
+        """Why ``quality`` fails the gate, or None if the face is good enough to encode."""
+        if quality.size < self.min_size:
+            return "small"
+        if quality.sharpness < self.min_sharpness:
+            return "blurred"
+        if not self.min_brightness <= quality.brightness <= self.max_brightness:
+            return "exposure"
+        if quality.contrast < self.min_contrast:
+            return "contrast"
+        if abs(quality.yaw) > self.max_yaw:
+            return "pose"
+        return None
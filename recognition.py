@@ -0,0 +1,622 @@
+import functools
+import logging
+import math
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from motion import MotionGate, merge_rois
+from quality import assess_face, crop_face
+from scheduler import AdaptiveScheduler
+from tracker import FaceTracker, associate, iou
+
+logger = logging.getLogger(__name__)
+
+# ``box`` is (top, right, bottom, left) in full-frame coordinates; ``encoding``
+# is None when the identity was reused from a tracked face. ``name`` is None
+# while a face was not encoded and its track has no identity yet (see
+# ``FaceTracker.select``). ``quality`` is a ``quality.FaceQuality`` for faces
+# that were assessed; ``crop`` is a padded BGR crop of the face from the frame
+# the result came from, added by ``RecognitionPipeline``. ``confirmed`` is set
+# by ``FaceTracker.update`` once the track's identity rests on enough votes
+FaceResult = namedtuple(
+    "FaceResult", ["box", "name", "distance", "margin", "encoding", "track_id", "quality", "crop", "confirmed"],
+    defaults=(None, None, None, False),
+)
+# ``camera`` is the name the pipeline was registered under in its ``RecognizerPool``
+RecognitionResult = namedtuple("RecognitionResult", ["seq", "timestamp", "faces", "elapsed", "camera"], defaults=(None,))
+# A frame after detection: ``chips`` are the aligned crops of ``result.faces[i] for i in pending``
+Detection = namedtuple("Detection", ["result", "pending", "chips"])
+
+# --------------------------
+# Worker process side
+# --------------------------
+_matcher = None
+
+
+def _init_worker(templates, tolerance):
+    # Runs once per worker process: build that process's copy of the gallery
+    global _matcher
+    from matcher import FaceMatcher
+
+    _matcher = FaceMatcher([], [], tolerance=tolerance)
+    _matcher.sync_templates(templates)
+
+
+def detect_faces(rgb_image, rois=None):
+    """HOG face detection, restricted to ``rois`` (x, y, w, h) when given."""
+    import face_recognition
+
+    if not rois:
+        return face_recognition.face_locations(rgb_image, model="hog")
+    face_locations = []
+    for x, y, w, h in rois:
+        crop = rgb_image[y:y + h, x:x + w]
+        for top, right, bottom, left in face_recognition.face_locations(crop, model="hog"):
+            face_locations.append((top + y, right + x, bottom + y, left + x))
+    return face_locations
+
+
+def detect_faces_pyramid(rgb_image, rois=None, coarse_scale=0.25, budget=0.25, padding=0.5):
+    """Two-pass HOG face detection on a full-resolution frame.
+
+    A coarse pass at ``coarse_scale`` finds the near faces cheaply. Their
+    boxes (grown by ``padding``) and the motion ``rois`` (x, y, w, h), or the
+    whole frame when ``rois`` is None, are then searched again at full
+    resolution, where HOG's own 2x upsampling reaches faces about 40 pixels
+    high. If those regions add up to more than ``budget`` of the frame's
+    area they are scaled down together to fit, so the second pass never
+    costs more than searching the frame at ``sqrt(budget)`` scale (0.5 by
+    default, the old single pass).
+    """
+    import face_recognition
+
+    height, width = rgb_image.shape[:2]
+    small = cv2.resize(rgb_image, (0, 0), fx=coarse_scale, fy=coarse_scale, interpolation=cv2.INTER_AREA)
+    coarse = [
+        tuple(int(coord / coarse_scale) for coord in location)
+        for location in face_recognition.face_locations(small, model="hog")
+    ]
+
+    regions = [(0, 0, width, height)] if rois is None else list(rois)
+    for top, right, bottom, left in coarse:
+        pad_y, pad_x = int((bottom - top) * padding), int((right - left) * padding)
+        x, y = max(0, left - pad_x), max(0, top - pad_y)
+        regions.append((x, y, min(width, right + pad_x) - x, min(height, bottom + pad_y) - y))
+    regions = merge_rois(regions)
+    area = sum(w * h for _, _, w, h in regions)
+    if not area:
+        return coarse
+
+    refine_scale = min(1.0, (budget * width * height / area) ** 0.5)
+    refined = []
+    for x, y, w, h in regions:
+        crop = rgb_image[y:y + h, x:x + w]
+        if refine_scale < 1.0:
+            crop = cv2.resize(crop, (0, 0), fx=refine_scale, fy=refine_scale, interpolation=cv2.INTER_AREA)
+        for top, right, bottom, left in face_recognition.face_locations(crop, model="hog"):
+            refined.append((
+                int(top / refine_scale) + y, int(right / refine_scale) + x,
+                int(bottom / refine_scale) + y, int(left / refine_scale) + x,
+            ))
+    # Keep coarse faces the second pass lost, e.g. to a downscaled region
+    return refined + [box for box in coarse if not any(iou(box, other) > 0.3 for other in refined)]
+
+
+def face_landmarks(rgb_image, face_locations):
+    """5-point dlib landmarks for each face; used for both alignment and pose."""
+    from face_recognition import api
+
+    if not face_locations:
+        return []
+    return api._raw_face_landmarks(rgb_image, face_locations, model="small")
+
+
+def align_faces(rgb_image, shapes):
+    """Aligned 150x150 face chips, the input dlib's face encoder works on."""
+    import dlib
+
+    if not shapes:
+        return []
+    detections = dlib.full_object_detections()
+    for shape in shapes:
+        detections.append(shape)
+    return list(dlib.get_face_chips(rgb_image, detections, size=150, padding=0.25))
+
+
+def detect_frame(seq, timestamp, rgb_image, scale, rois=None, hints=(), pyramid=None):
+    """Detect, assess and align faces in one frame; encoding is left to ``encode_faces``.
+
+    ``rgb_image`` is the frame shrunk by ``1 / scale``, or with ``pyramid``
+    (``(coarse_scale, budget)`` for ``detect_faces_pyramid``) the full frame.
+
+    Detections overlapping a tracker hint (a confirmed track's box) reuse
+    that track's identity and are not aligned. The others come back with
+    ``name=None``, their ``FaceQuality`` and their chips, in the order of
+    ``pending``; the landmarks found for alignment also give the head pose.
+    """
+    start = time.perf_counter()
+    if pyramid is not None:
+        face_locations = detect_faces_pyramid(rgb_image, rois, *pyramid)
+    else:
+        face_locations = detect_faces(rgb_image, rois)
+    # Scale coordinates back to original size
+    boxes = [tuple(int(coord * scale) for coord in location) for location in face_locations]
+    reused = associate([hint[1] for hint in hints], boxes)
+
+    pending = [i for i in range(len(boxes)) if i not in reused]
+    shapes = face_landmarks(rgb_image, [face_locations[i] for i in pending])
+    gray = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2GRAY) if pending else None
+    qualities = {i: assess_face(gray, face_locations[i], shape) for i, shape in zip(pending, shapes)}
+
+    faces = []
+    for i, box in enumerate(boxes):
+        if i in reused:
+            track_id, _, name, distance = hints[reused[i]]
+            faces.append(FaceResult(box, name, distance, float("inf"), None, track_id))
+        else:
+            faces.append(FaceResult(box, None, None, None, None, quality=qualities[i]))
+    chips = align_faces(rgb_image, shapes)
+    result = RecognitionResult(seq, timestamp, faces, time.perf_counter() - start)
+    return Detection(result, pending, chips)
+
+
+def encode_faces(chips):
+    """Encode and match aligned chips from any number of frames in one pass.
+
+    Returns ``[(encoding, match), ...]`` in chip order and the time taken.
+    """
+    from face_recognition import api
+
+    start = time.perf_counter()
+    encodings = [np.array(descriptor) for descriptor in api.face_encoder.compute_face_descriptor(chips)]
+    return list(zip(encodings, _matcher.match(encodings))), time.perf_counter() - start
+
+
+# --------------------------
+# Encoding batches
+# --------------------------
+class EncodingBatcher:
+    """Groups face chips from every camera into micro-batches for ``encode_faces``.
+
+    dlib encodes a list of chips in one call for much less than one call
+    per face, so chips wait up to ``max_wait`` seconds for company. A batch
+    is sent as soon as it holds ``max_batch`` chips, when its oldest chips
+    have waited ``max_wait``, or straight away when ``idle()`` says no
+    detection is running that could add to it. ``callback(pairs, elapsed)``
+    gets each caller's share of the batch, or ``None`` if it was lost.
+    """
+
+    def __init__(self, execute, idle, max_batch=16, max_wait=0.05):
+        self.execute = execute
+        self.idle = idle
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.encoded = 0
+        self._pending = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="encoding-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def add(self, chips, callback):
+        with self._cond:
+            self._pending.append((chips, callback, time.monotonic()))
+            self._size += len(chips)
+            self._cond.notify()
+
+    def poke(self):
+        """Re-check the flush conditions, e.g. after a detection finished."""
+        with self._cond:
+            self._cond.notify()
+
+    def _ready(self):
+        if not self._pending:
+            return False
+        return (
+            self._size >= self.max_batch
+            or time.monotonic() - self._pending[0][2] >= self.max_wait
+            or self.idle()
+        )
+
+    def _timeout(self):
+        if not self._pending:
+            return None
+        return max(0.0, self._pending[0][2] + self.max_wait - time.monotonic())
+
+    def _take(self):
+        batch, size = [], 0
+        while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch):
+            entry = self._pending.pop(0)
+            batch.append(entry)
+            size += len(entry[0])
+        self._size -= size
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._ready():
+                    self._cond.wait(self._timeout())
+                if not self._running:
+                    dropped, self._pending, self._size = self._pending, [], 0
+                    break
+                batch = self._take()
+            self._send(batch)
+        for _, callback, _ in dropped:
+            callback(None, 0.0)
+
+    def _send(self, batch):
+        chips = [chip for entry in batch for chip in entry[0]]
+        future = self.execute(encode_faces, chips)
+        if future is None:
+            for _, callback, _ in batch:
+                callback(None, 0.0)
+            return
+        self.batches += 1
+        self.encoded += len(chips)
+        future.add_done_callback(lambda f: self._deliver(batch, f))
+
+    def _deliver(self, batch, future):
+        try:
+            pairs, elapsed = future.result()
+        except Exception as e:
+            logger.error(f"Face encoding failed for a batch of {sum(len(entry[0]) for entry in batch)}: {e}")
+            pairs, elapsed = None, 0.0
+        offset = 0
+        for chips, callback, _ in batch:
+            if pairs is None:
+                callback(None, 0.0)
+                continue
+            # Each frame is charged its share of the batch time
+            callback(pairs[offset:offset + len(chips)], elapsed * len(chips) / len(pairs))
+            offset += len(chips)
+
+
+# --------------------------
+# Shared worker pool
+# --------------------------
+class RecognizerPool:
+    """One process pool, and one copy of the gallery per worker, shared by every camera.
+
+    Each camera's ``RecognitionPipeline`` asks for a worker slot with
+    ``try_acquire()`` before submitting a frame. A camera already using its
+    fair share (``max_workers`` split evenly over the registered cameras) is
+    only refused while another camera has been refused within the last
+    ``starvation_window`` seconds, so a busy camera can use idle capacity
+    without starving the others. Each camera's scheduler is told its share as
+    its ``workers`` budget.
+
+    Frames are only detected and aligned under those slots; their face
+    chips go through one ``EncodingBatcher`` (``max_batch``, ``max_wait``)
+    so faces from every camera are encoded together.
+    """
+
+    def __init__(self, templates, tolerance=0.6, max_workers=2, starvation_window=0.5, max_batch=16, max_wait=0.05):
+        self.templates = templates
+        self.tolerance = tolerance
+        self.max_workers = max_workers
+        self.starvation_window = starvation_window
+        self.in_flight = {}
+        self.submitted = {}
+        self._schedulers = {}
+        self._refused = {}
+        self._pool = None
+        self._lock = threading.Lock()
+        self.batcher = EncodingBatcher(self._execute, self.idle, max_batch=max_batch, max_wait=max_wait)
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.templates, self.tolerance),
+            )
+            self.batcher.start()
+
+    def stop(self):
+        self.batcher.stop()
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def restart(self, templates=None):
+        """Replace the workers, e.g. so they load a new gallery; frames in flight are dropped."""
+        if templates is not None:
+            self.templates = templates
+        running = self._pool is not None
+        self.stop()
+        if running:
+            self.start()
+
+    def register(self, camera, scheduler):
+        with self._lock:
+            self._schedulers[camera] = scheduler
+            self.in_flight.setdefault(camera, 0)
+            self.submitted.setdefault(camera, 0)
+            self._rebalance()
+
+    def unregister(self, camera):
+        with self._lock:
+            self._schedulers.pop(camera, None)
+            self._refused.pop(camera, None)
+            self._rebalance()
+
+    def _rebalance(self):
+        share = self.max_workers / max(1, len(self._schedulers))
+        for scheduler in self._schedulers.values():
+            scheduler.workers = share
+
+    def try_acquire(self, camera):
+        """Reserve a worker slot for ``camera``; False means skip this frame."""
+        with self._lock:
+            now = time.monotonic()
+            if sum(self.in_flight.values()) >= self.max_workers:
+                self._refused[camera] = now
+                return False
+            share = math.ceil(self.max_workers / max(1, len(self._schedulers)))
+            others_waiting = any(
+                now - refused < self.starvation_window for other, refused in self._refused.items() if other != camera
+            )
+            if self.in_flight.get(camera, 0) >= share and others_waiting:
+                self._refused[camera] = now
+                return False
+            self._refused.pop(camera, None)
+            self.in_flight[camera] = self.in_flight.get(camera, 0) + 1
+            return True
+
+    def release(self, camera):
+        with self._lock:
+            self.in_flight[camera] -= 1
+        # A waiting batch may now be as full as it will get
+        self.batcher.poke()
+
+    def idle(self):
+        """True if no frame is being detected."""
+        with self._lock:
+            return not any(self.in_flight.values())
+
+    def submit(self, camera, fn, *args):
+        """Run ``fn`` on a worker; None if the pool was stopped in the meantime."""
+        with self._lock:
+            self.submitted[camera] = self.submitted.get(camera, 0) + 1
+        return self._execute(fn, *args)
+
+    def encode(self, chips, callback):
+        """Queue face chips for the next encoding batch."""
+        self.batcher.add(chips, callback)
+
+    def _execute(self, fn, *args):
+        with self._lock:
+            pool = self._pool
+        if pool is None:
+            return None
+        try:
+            return pool.submit(fn, *args)
+        except RuntimeError:
+            # Shut down between the check and the submit
+            return None
+
+
+# --------------------------
+# Pipeline stage
+# --------------------------
+class RecognitionPipeline:
+    """Runs face detection, encoding and matching in a process pool.
+
+    A dispatcher thread takes frames from the camera's ring, lets the
+    ``AdaptiveScheduler`` pick which ones to submit to the pool (at most
+    ``max_workers`` in flight; extra frames are skipped rather than queued)
+    and collects results as they finish. A ``MotionGate`` sits in front of
+    the scheduler: frames without motion are not recognised (apart from a
+    full-frame check every ``idle_check`` seconds to catch people standing
+    still), and moving frames are only searched inside their motion regions.
+    Motion and frames with faces in them count as scene activity, which
+    raises the sampling rate. A ``FaceTracker`` carries identities across
+    frames so people who linger are not re-encoded on every frame. The display loop reads
+    ``latest`` to draw boxes on live frames and ``drain()`` to log new
+    results, so it never waits on dlib.
+
+    With several cameras, give each its own pipeline (capture, motion,
+    scheduling and tracking stay per camera) and pass them all the same
+    ``pool`` so the workers and gallery exist once. Without ``pool`` the
+    pipeline runs its own ``RecognizerPool`` of ``max_workers``.
+
+    With ``pyramid`` (the default) workers get full-resolution frames and
+    run ``detect_faces_pyramid``: a coarse pass at ``coarse_scale``, then
+    full resolution only around coarse hits and motion regions, within
+    ``refine_budget`` of the frame area. That finds faces about half the
+    size the plain ``scale`` downscale can, at a similar cost. Without it,
+    frames are shrunk by ``scale`` and searched in one pass.
+    """
+
+    def __init__(self, camera, templates=None, tolerance=0.6, max_workers=2, max_latency=1.0, cpu_budget=0.5, scale=0.5,
+                 motion_gate=True, idle_check=10.0, max_roi_fraction=0.5, pool=None, name="camera",
+                 pyramid=True, coarse_scale=0.25, refine_budget=0.25, crop_padding=0.3):
+        self.camera = camera
+        self.name = name
+        self._owns_pool = pool is None
+        self.pool = RecognizerPool(templates, tolerance, max_workers) if pool is None else pool
+        self.scheduler = AdaptiveScheduler(max_latency=max_latency, cpu_budget=cpu_budget, workers=self.pool.max_workers)
+        self.pyramid = (coarse_scale, refine_budget) if pyramid else None
+        # The pyramid downscales inside the worker
+        self.scale = 1.0 if pyramid else scale
+        self.crop_padding = crop_padding
+        self.motion = MotionGate() if motion_gate else None
+        self.idle_check = idle_check
+        self.max_roi_fraction = max_roi_fraction
+        self.motion_skipped = 0
+        self.last_motion = None
+        self.tracker = FaceTracker(max_age=max(2.0, 2 * max_latency))
+        self._last_full_check = 0.0
+        self.latest = None
+        self.completed = 0
+        # Capture-to-result time, smoothed
+        self.latency = None
+        self._results = deque(maxlen=256)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        if self._running:
+            return
+        if self._owns_pool:
+            self.pool.start()
+        self.pool.register(self.name, self.scheduler)
+        self._running = True
+        self._thread = threading.Thread(target=self._dispatch, name="recognition-dispatch", daemon=True)
+        self._thread.start()
+
+    def _dispatch(self):
+        last_seq = -1
+        while self._running:
+            frame = self.camera.wait_newer(last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            last_seq = frame.seq
+            rois = self._gate(frame)
+            if rois is False:
+                continue
+            if not self.pool.try_acquire(self.name):
+                continue
+            if not self.scheduler.should_process(frame.timestamp, self.camera.fps):
+                self.pool.release(self.name)
+                continue
+            if rois is None:
+                self._last_full_check = frame.timestamp
+            # Resize frame for faster processing and convert to RGB for face_recognition
+            image = frame.image if self.scale == 1.0 else cv2.resize(frame.image, (0, 0), fx=self.scale, fy=self.scale)
+            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            hints = self.tracker.hints(frame.timestamp)
+            future = self.pool.submit(
+                self.name, detect_frame, frame.seq, frame.timestamp, rgb_image, 1 / self.scale, rois, hints, self.pyramid
+            )
+            if future is None:
+                self.pool.release(self.name)
+                continue
+            # The ring recycles the frame long before recognition finishes, so the
+            # submitted image travels with the job and faces are cropped from it
+            future.add_done_callback(functools.partial(self._on_done, rgb_image))
+
+    def _gate(self, frame):
+        """Motion regions to search (detection-image coords), None for the whole
+        frame, or False to skip the frame."""
+        if self.motion is None:
+            return None
+        motion = self.motion.update(frame.image)
+        if not motion.moving:
+            if frame.timestamp - self._last_full_check >= self.idle_check:
+                return None
+            self.motion_skipped += 1
+            return False
+        self.last_motion = frame.timestamp
+        self.scheduler.observe_activity(min(1.0, motion.score / self.max_roi_fraction))
+        height, width = frame.image.shape[:2]
+        if sum(w * h for _, _, w, h in motion.rois) > self.max_roi_fraction * width * height:
+            return None
+        return [tuple(int(v * self.scale) for v in roi) for roi in motion.rois]
+
+    def _on_done(self, image, future):
+        self.pool.release(self.name)
+        try:
+            detection = future.result()
+        except Exception as e:
+            logger.error(f"Recognition failed on {self.name}: {e}")
+            return
+        # Low-quality faces, and faces no better than their track's best few, are not encoded
+        result = detection.result
+        wanted = self.tracker.select([result.faces[i] for i in detection.pending], result.timestamp)
+        pending = [i for i, want in zip(detection.pending, wanted) if want]
+        chips = [chip for chip, want in zip(detection.chips, wanted) if want]
+        if not chips:
+            self._complete(result, image)
+            return
+        # Encoded together with faces from other frames and cameras
+        self.pool.encode(
+            chips, functools.partial(self._on_encoded, detection._replace(pending=pending, chips=chips), image)
+        )
+
+    def _on_encoded(self, detection, image, pairs, elapsed):
+        if pairs is None:
+            return
+        result = detection.result
+        faces = list(result.faces)
+        for i, (encoding, match) in zip(detection.pending, pairs):
+            faces[i] = faces[i]._replace(name=match.name, distance=match.distance, margin=match.margin, encoding=encoding)
+        self._complete(result._replace(faces=faces, elapsed=result.elapsed + elapsed), image)
+
+    def _crop(self, image, box):
+        crop = crop_face(image, tuple(int(coord * self.scale) for coord in box), self.crop_padding)
+        return cv2.cvtColor(crop, cv2.COLOR_RGB2BGR) if crop is not None else None
+
+    def _complete(self, result, image):
+        faces = self.tracker.update(result.faces, result.timestamp)
+        faces = [face._replace(crop=self._crop(image, face.box)) for face in faces]
+        result = result._replace(faces=faces, camera=self.name)
+        self.scheduler.record(result.elapsed)
+        latency = time.time() - result.timestamp
+        self.latency = latency if self.latency is None else self.latency + 0.2 * (latency - self.latency)
+        if result.faces:
+            self.scheduler.observe_activity(1.0)
+        with self._lock:
+            self.completed += 1
+            # Workers can finish out of order; never replace a newer result
+            if self.latest is None or result.seq > self.latest.seq:
+                self.latest = result
+            self._results.append(result)
+
+    def drain(self):
+        """Results completed since the last call, oldest first."""
+        with self._lock:
+            results = sorted(self._results, key=lambda r: r.seq)
+            self._results.clear()
+        return results
+
+    def stats(self):
+        """Per-camera rates and timings for status displays."""
+        decision = self.scheduler.decision
+        return {
+            "fps": self.camera.fps,
+            "latency": self.latency,
+            "recognition_time": decision.recognition_time,
+            "interval": decision.interval,
+            "stride": decision.stride,
+            "reason": decision.reason,
+            "submitted": self.scheduler.submitted,
+            "skipped": self.scheduler.skipped,
+            "motion_skipped": self.motion_skipped,
+            "completed": self.completed,
+            "quality_deferred": self.tracker.deferred,
+            "quality_skipped": self.tracker.skipped,
+        }
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self.pool.unregister(self.name)
+        if self._owns_pool:
+            self.pool.stop()
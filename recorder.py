@@ -0,0 +1,323 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# ``reasons`` is every trigger that extended the clip ("unknown", "motion", "manual", ...)
+Clip = namedtuple("Clip", ["path", "start", "end", "frames", "fps", "reasons"])
+
+_CLOSE = object()
+
+
+def measured_fps(timestamps, default=20.0):
+    """Frame rate from a run of capture timestamps, or ``default`` if there are too few."""
+    if len(timestamps) < 2 or timestamps[-1] <= timestamps[0]:
+        return default
+    return (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+
+
+class EventRecorder:
+    """Records clips around events, with frames from before the event.
+
+    A tap thread copies every camera frame into a ``pre_roll``-second buffer.
+    ``trigger()`` starts a clip that begins with that buffer and runs until
+    ``post_roll`` seconds after the last trigger; ``hold()`` keeps a clip
+    going until ``release()``. Frames are encoded on a separate writer thread
+    at the capture rate measured over the pre-roll, so a slow encoder never
+    stalls capture or the display loop. If the writer falls more than
+    ``max_backlog`` frames behind, new frames are dropped and counted.
+    Finished clips are added to ``index`` (a ``recordings.RecordingIndex``),
+    flagged as alerts if an unknown face triggered them.
+    """
+
+    def __init__(self, camera, directory="video_records", pre_roll=3.0, post_roll=10.0, max_backlog=300,
+                 fourcc="mp4v", extension=".mp4", index=None, name=None):
+        self.camera = camera
+        self.index = index
+        # Camera name, added to file names when several cameras share a directory
+        self.prefix = f"clip_{name}_" if name else "clip_"
+        self.directory = directory
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.fourcc = fourcc
+        self.extension = extension
+        # Only the newest finished clip is kept; the index has the rest
+        self.last_clip = None
+        self.dropped = 0
+        self._buffer = deque()
+        self._queue = queue.Queue(maxsize=max_backlog)
+        self._lock = threading.Lock()
+        self._recording_until = None
+        self._held = False
+        self._reasons = []
+        self._current = None
+        self._running = False
+        self._tap_thread = None
+        self._writer_thread = None
+
+    # --------------------------
+    # Control
+    # --------------------------
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._tap_thread = threading.Thread(target=self._tap, name="recorder-tap", daemon=True)
+        self._writer_thread = threading.Thread(target=self._write, name="recorder-writer", daemon=True)
+        self._tap_thread.start()
+        self._writer_thread.start()
+
+    def trigger(self, reason, timestamp=None):
+        """Start a clip, or extend the current one to ``post_roll`` after ``timestamp``."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            until = timestamp + self.post_roll
+            if self._recording_until is None or until > self._recording_until:
+                self._recording_until = until
+            if reason not in self._reasons:
+                self._reasons.append(reason)
+
+    def hold(self):
+        """Record until ``release()``, e.g. for a manual clip."""
+        with self._lock:
+            self._held = True
+            if "manual" not in self._reasons:
+                self._reasons.append("manual")
+            if self._recording_until is None:
+                self._recording_until = time.time()
+
+    def release(self):
+        with self._lock:
+            self._held = False
+
+    @property
+    def recording(self):
+        return self._current is not None
+
+    def stop(self):
+        """Finish any clip in progress and stop both threads."""
+        self._running = False
+        if self._tap_thread is not None:
+            self._tap_thread.join(timeout=2)
+            self._tap_thread = None
+        if self._writer_thread is not None:
+            self._queue.put(_CLOSE)
+            self._writer_thread.join()
+            self._writer_thread = None
+
+    # --------------------------
+    # Tap thread
+    # --------------------------
+    def _tap(self):
+        last_seq = -1
+        while self._running:
+            frame = self.camera.wait_newer(last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            last_seq = frame.seq
+            # The ring slot is recycled within a few frames, so keep a copy
+            item = (frame.timestamp, frame.image.copy())
+            self._buffer.append(item)
+            while self._buffer and item[0] - self._buffer[0][0] > self.pre_roll:
+                self._buffer.popleft()
+
+            with self._lock:
+                active = self._recording_until is not None and (self._held or frame.timestamp <= self._recording_until)
+                if not active and self._current is not None:
+                    self._recording_until = None
+                    reasons, self._reasons = self._reasons, []
+                else:
+                    reasons = None
+            if active and self._current is None:
+                self._begin(frame.timestamp)
+            elif active:
+                self._enqueue(item)
+            elif reasons is not None:
+                self._finish(reasons)
+        if self._current is not None:
+            with self._lock:
+                reasons, self._reasons = self._reasons, []
+                self._recording_until = None
+            self._finish(reasons)
+
+    def _begin(self, timestamp):
+        fps = measured_fps([ts for ts, _ in self._buffer])
+        started = self._buffer[0][0] if self._buffer else timestamp
+        name = f"{self.prefix}{datetime.fromtimestamp(started).strftime('%Y%m%d_%H%M%S')}{self.extension}"
+        self._current = {"path": os.path.join(self.directory, name), "start": started, "fps": fps}
+        self._queue.put(("open", self._current["path"], fps))
+        for item in list(self._buffer):
+            self._enqueue(item)
+
+    def _enqueue(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"Recorder backlog full; dropped {self.dropped} frames so far")
+            return
+        self._current["end"] = item[0]
+
+    def _finish(self, reasons):
+        current, self._current = self._current, None
+        self._queue.put(("close", current, tuple(reasons)))
+
+    # --------------------------
+    # Writer thread
+    # --------------------------
+    def _write(self):
+        writer = None
+        frames = 0
+        while True:
+            item = self._queue.get()
+            if item is _CLOSE:
+                break
+            if item[0] == "open":
+                _, path, fps = item
+                os.makedirs(self.directory, exist_ok=True)
+                writer, frames = None, 0
+                open_args = (path, cv2.VideoWriter_fourcc(*self.fourcc), fps)
+                continue
+            if item[0] == "close":
+                _, current, reasons = item
+                if writer is not None:
+                    writer.release()
+                    writer = None
+                    clip = Clip(
+                        current["path"], current["start"], current.get("end", current["start"]),
+                        frames, current["fps"], reasons,
+                    )
+                    self.last_clip = clip
+                    if self.index is not None:
+                        self.index.add(clip.path, "clip", clip.start, clip.end, alert="unknown" in reasons)
+                    logger.info(f"Saved clip {current['path']} ({frames} frames, {', '.join(reasons)})")
+                continue
+            _, image = item
+            if writer is None:
+                height, width = image.shape[:2]
+                writer = cv2.VideoWriter(*open_args, (width, height))
+            writer.write(image)
+            frames += 1
+        if writer is not None:
+            writer.release()
+
+
+class ContinuousRecorder:
+    """Records the camera non-stop as fixed-length segment files.
+
+    Each segment covers ``segment_seconds`` and is written under a
+    ``.part`` name, renamed when complete and then added to ``index``. A
+    crash loses at most the segment in progress. As with ``EventRecorder``,
+    frames are copied off the ring by a tap thread and encoded on a writer
+    thread, at the frame rate measured over the first second of capture.
+    """
+
+    def __init__(self, camera, index=None, directory="video_records/continuous", segment_seconds=60.0,
+                 max_backlog=300, fourcc="mp4v", extension=".mp4", name=None):
+        self.camera = camera
+        self.index = index
+        self.prefix = f"segment_{name}_" if name else "segment_"
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.fourcc = fourcc
+        self.extension = extension
+        self.segments = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_backlog)
+        self._running = False
+        self._tap_thread = None
+        self._writer_thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._tap_thread = threading.Thread(target=self._tap, name="segment-tap", daemon=True)
+        self._writer_thread = threading.Thread(target=self._write, name="segment-writer", daemon=True)
+        self._tap_thread.start()
+        self._writer_thread.start()
+
+    def stop(self):
+        """Close the segment in progress and stop both threads."""
+        self._running = False
+        if self._tap_thread is not None:
+            self._tap_thread.join(timeout=2)
+            self._tap_thread = None
+        if self._writer_thread is not None:
+            self._queue.put(_CLOSE)
+            self._writer_thread.join()
+            self._writer_thread = None
+
+    def _tap(self):
+        last_seq = -1
+        while self._running:
+            frame = self.camera.wait_newer(last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            last_seq = frame.seq
+            try:
+                self._queue.put_nowait((frame.timestamp, frame.image.copy()))
+            except queue.Full:
+                self.dropped += 1
+                if self.dropped % 100 == 1:
+                    logger.warning(f"Segment backlog full; dropped {self.dropped} frames so far")
+
+    def _open(self, started, fps, shape):
+        name = f"{self.prefix}{datetime.fromtimestamp(started).strftime('%Y%m%d_%H%M%S')}"
+        final = os.path.join(self.directory, name + self.extension)
+        part = os.path.join(self.directory, name + ".part" + self.extension)
+        os.makedirs(self.directory, exist_ok=True)
+        height, width = shape[:2]
+        writer = cv2.VideoWriter(part, cv2.VideoWriter_fourcc(*self.fourcc), fps, (width, height))
+        return {"writer": writer, "part": part, "path": final, "start": started, "end": started}
+
+    def _close(self, segment):
+        segment["writer"].release()
+        os.replace(segment["part"], segment["path"])
+        self.segments += 1
+        if self.index is not None:
+            self.index.add(segment["path"], "segment", segment["start"], segment["end"])
+
+    def _write(self):
+        segment = None
+        warmup = []
+        fps = None
+        while True:
+            item = self._queue.get()
+            if item is _CLOSE:
+                break
+            timestamp, image = item
+            if fps is None:
+                # Measure the real capture rate before opening the first segment
+                warmup.append(item)
+                if timestamp - warmup[0][0] < 1.0:
+                    continue
+                fps = measured_fps([ts for ts, _ in warmup])
+                pending, warmup = warmup, []
+            else:
+                pending = [item]
+            for timestamp, image in pending:
+                if segment is not None and timestamp - segment["start"] >= self.segment_seconds:
+                    # Back-to-back segments, so every detection time falls inside one
+                    segment["end"] = timestamp
+                    self._close(segment)
+                    segment = None
+                if segment is None:
+                    segment = self._open(timestamp, fps, image.shape)
+                segment["writer"].write(image)
+                segment["end"] = timestamp
+        if warmup:
+            segment = self._open(warmup[0][0], measured_fps([ts for ts, _ in warmup]), warmup[0][1].shape)
+            for timestamp, image in warmup:
+                segment["writer"].write(image)
+                segment["end"] = timestamp
+        if segment is not None:
+            self._close(segment)
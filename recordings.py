@@ -0,0 +1,253 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    size INTEGER NOT NULL,
+    alert INTEGER NOT NULL DEFAULT 0,
+    labels TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_recordings_start ON recordings (start);
+CREATE INDEX IF NOT EXISTS idx_recordings_end ON recordings (end);
+"""
+
+# ``labels`` is {label: detections} for the detections that fall inside the recording
+Recording = namedtuple("Recording", ["path", "kind", "start", "end", "size", "alert", "labels"])
+
+MEDIA_EXTENSIONS = (".mp4", ".avi", ".mkv", ".jpg", ".jpeg", ".png")
+
+
+def _epoch(timestamp):
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    # Detection timestamps are naive local wall-clock times
+    return pd.Timestamp(timestamp).to_pydatetime().timestamp()
+
+
+class RecordingIndex:
+    """SQLite index of every recording on disk: segments, event clips and snapshots.
+
+    Each row has the covered time range, file size, and the detections that
+    fell inside it. A recording with an unknown-face detection is flagged
+    ``alert``, which protects it from quota pruning. Plug the index into
+    ``DetectionSink(observers=...)`` to link detections as they are stored.
+    Detections that arrive before their segment is closed are held back for
+    up to ``pending_seconds`` and applied when it is added. All threads
+    share one connection, used under a lock.
+    """
+
+    def __init__(self, path="video_records/recordings.db", pending_seconds=600.0):
+        self.path = path
+        self.pending_seconds = pending_seconds
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._pending = []
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _conn(self):
+        with self._db_lock:
+            if self._connection is None:
+                raise sqlite3.ProgrammingError("Recording index is closed")
+            yield self._connection
+
+    # --------------------------
+    # Recordings
+    # --------------------------
+    def add(self, path, kind, start, end, alert=False, labels=None):
+        """Register a finished file, folding in any detections already seen for its time range."""
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        labels = dict(labels or {})
+        with self._lock:
+            keep = []
+            for timestamp, label, is_alert in self._pending:
+                if start <= timestamp <= end:
+                    labels[label] = labels.get(label, 0) + 1
+                    alert = alert or is_alert
+                else:
+                    keep.append((timestamp, label, is_alert))
+            self._pending = keep
+        with self._conn() as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO recordings (path, kind, start, end, size, alert, labels) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [path, kind, start, end, size, int(bool(alert)), json.dumps(labels)],
+            )
+
+    def remove(self, path):
+        with self._conn() as conn, conn:
+            conn.execute("DELETE FROM recordings WHERE path = ?", [path])
+
+    def _rows(self, sql, params=()):
+        with self._conn() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            Recording(path, kind, start, end, size, bool(alert), json.loads(labels))
+            for path, kind, start, end, size, alert, labels in rows
+        ]
+
+    def recordings(self, start=None, end=None, kind=None):
+        """Recordings overlapping ``[start, end]``, oldest first."""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("end >= ?")
+            params.append(_epoch(start))
+        if end is not None:
+            clauses.append("start <= ?")
+            params.append(_epoch(end))
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return self._rows(f"SELECT * FROM recordings{where} ORDER BY start", params)
+
+    def total_size(self):
+        with self._conn() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM recordings").fetchone()[0]
+
+    def paths(self):
+        with self._conn() as conn:
+            return {row[0] for row in conn.execute("SELECT path FROM recordings")}
+
+    # --------------------------
+    # Detection linking (DetectionSink observer)
+    # --------------------------
+    def record_batch(self, rows):
+        """Link ``(timestamp, label, alert_triggered)`` rows to the recordings covering them."""
+        recent = []
+        with self._conn() as conn, conn:
+            for timestamp, label, alert in rows:
+                if isinstance(alert, str):
+                    alert = alert == "Yes"
+                ts = _epoch(timestamp)
+                matches = conn.execute("SELECT path, alert, labels FROM recordings WHERE start <= ? AND end >= ?", [ts, ts]).fetchall()
+                for path, was_alert, labels in matches:
+                    labels = json.loads(labels)
+                    labels[label] = labels.get(label, 0) + 1
+                    conn.execute(
+                        "UPDATE recordings SET alert = ?, labels = ? WHERE path = ?",
+                        [int(bool(was_alert) or bool(alert)), json.dumps(labels), path],
+                    )
+                # The segment being written may cover it once it is closed
+                recent.append((ts, label, bool(alert)))
+        cutoff = time.time() - self.pending_seconds
+        with self._lock:
+            self._pending = [row for row in self._pending + recent if row[0] >= cutoff]
+
+    def close(self):
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class RetentionManager:
+    """Background pruning of recordings by age and total size.
+
+    Every ``interval`` seconds it deletes recordings older than
+    ``max_age_days``, then the oldest ones until the total is under
+    ``max_bytes``. Recordings flagged ``alert`` are never pruned for space
+    and are kept for ``alert_max_age_days`` instead. Untracked media files in
+    ``directories`` ({directory: kind}) are adopted into the index first, so
+    files from before the index existed are managed too.
+    """
+
+    def __init__(self, index, directories, max_age_days=30, alert_max_age_days=90,
+                 max_bytes=20 * 1024 ** 3, interval=300.0):
+        self.index = index
+        self.directories = dict(directories)
+        self.max_age_days = max_age_days
+        self.alert_max_age_days = alert_max_age_days
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.deleted = 0
+        self.freed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="recording-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.adopt()
+                self.prune()
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"Recording retention failed: {e}")
+            self._stop.wait(self.interval)
+
+    def adopt(self, min_age=120.0):
+        """Index media files nobody registered (older files, or leftovers of a crash)."""
+        known = self.index.paths()
+        now = time.time()
+        for directory, kind in self.directories.items():
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if not entry.is_file() or not entry.name.lower().endswith(MEDIA_EXTENSIONS):
+                    continue
+                if entry.path in known:
+                    continue
+                modified = entry.stat().st_mtime
+                # Younger files may still be open for writing
+                if now - modified < min_age:
+                    continue
+                self.index.add(entry.path, kind, modified, modified)
+
+    def _delete(self, recording):
+        try:
+            os.remove(recording.path)
+        except FileNotFoundError:
+            pass
+        self.index.remove(recording.path)
+        self.deleted += 1
+        self.freed += recording.size
+        logger.info(f"Pruned {recording.kind} {recording.path} ({recording.size} bytes)")
+
+    def prune(self, now=None):
+        now = time.time() if now is None else now
+        recordings = self.index.recordings()
+        kept = []
+        for recording in recordings:
+            max_age = self.alert_max_age_days if recording.alert else self.max_age_days
+            if max_age is not None and now - recording.end > max_age * 86400:
+                self._delete(recording)
+            else:
+                kept.append(recording)
+
+        total = sum(recording.size for recording in kept)
+        for recording in kept:
+            if total <= self.max_bytes:
+                break
+            if recording.alert:
+                continue
+            self._delete(recording)
+            total -= recording.size
+        if total > self.max_bytes:
+            logger.warning(f"Recordings use {total} bytes, over the {self.max_bytes} byte quota, but the rest contain alerts")
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import namedtuple
+
+Decision = namedtuple("Decision", ["interval", "stride", "reason", "recognition_time", "activity"])
+
+
+class AdaptiveScheduler:
+    """Decides which frames go to recognition, replacing a fixed every-5th rule.
+
+    The sampling interval is derived from three inputs:
+
+    * latency budget -- a face has to be sampled and recognised within
+      ``max_latency`` seconds, so the interval may be at most
+      ``max_latency - recognition_time``;
+    * CPU budget -- recognition may occupy at most ``cpu_budget`` of the
+      ``workers`` available, so the interval must be at least
+      ``recognition_time / (cpu_budget * workers)``;
+    * scene activity (0..1) -- an active scene samples as fast as the CPU
+      budget allows, an idle one as slowly as the latency budget allows.
+
+    ``decision`` exposes the current interval, the equivalent frame stride and
+    which constraint set it.
+    """
+
+    def __init__(self, max_latency=1.0, cpu_budget=0.5, workers=1, min_interval=0.05,
+                 smoothing=0.2, activity_half_life=3.0):
+        self.max_latency = max_latency
+        self.cpu_budget = cpu_budget
+        self.workers = workers
+        self.min_interval = min_interval
+        self.smoothing = smoothing
+        self.activity_half_life = activity_half_life
+        self.recognition_time = None
+        self.activity = 1.0
+        self.fps = None
+        self.decision = Decision(min_interval, 1, "warm-up", 0.0, self.activity)
+        self.submitted = 0
+        self.skipped = 0
+        self._last_submit = None
+        self._activity_at = time.time()
+        self._lock = threading.Lock()
+
+    def _decay_activity(self, now):
+        elapsed = now - self._activity_at
+        self.activity *= 0.5 ** (elapsed / self.activity_half_life)
+        self._activity_at = now
+
+    def observe_activity(self, level, now=None):
+        """Report scene activity in [0, 1]; it decays when nothing is reported."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._decay_activity(now)
+            self.activity = max(self.activity, min(1.0, max(0.0, level)))
+
+    def record(self, recognition_time):
+        """Report how long one recognition call took (seconds)."""
+        with self._lock:
+            if self.recognition_time is None:
+                self.recognition_time = recognition_time
+            else:
+                self.recognition_time += self.smoothing * (recognition_time - self.recognition_time)
+
+    def _interval(self):
+        if self.recognition_time is None:
+            return self.min_interval, "warm-up"
+        cpu_floor = max(self.min_interval, self.recognition_time / (self.cpu_budget * self.workers))
+        latency_ceiling = self.max_latency - self.recognition_time
+        if latency_ceiling <= cpu_floor:
+            # Can't meet both budgets: stay inside the CPU budget and accept the latency
+            return cpu_floor, "cpu-bound"
+        interval = latency_ceiling - self.activity * (latency_ceiling - cpu_floor)
+        if self.activity > 0.5:
+            return interval, "active"
+        return interval, "idle"
+
+    def should_process(self, timestamp, fps=None):
+        """Return True if the frame captured at ``timestamp`` should be recognised.
+
+        ``fps`` is the camera's capture rate, used to express the interval as
+        a frame stride; it has to come from the camera because most frames
+        never reach the scheduler.
+        """
+        with self._lock:
+            if fps is not None:
+                self.fps = fps
+            self._decay_activity(time.time())
+
+            interval, reason = self._interval()
+            stride = max(1, round(interval * self.fps)) if self.fps else 1
+            self.decision = Decision(interval, stride, reason, self.recognition_time or 0.0, self.activity)
+            if self._last_submit is None or timestamp - self._last_submit >= interval:
+                self._last_submit = timestamp
+                self.submitted += 1
+                return True
+            self.skipped += 1
+            return False
@@ -0,0 +1,653 @@
+import argparse
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import pandas as pd
+
+from alerts import Alert, AlertDispatcher, CallMeBotTransport
+from camera import CameraConfig, CameraStream, load_camera_configs, parse_source
+from dedup import DetectionDeduper, detection_key
+from detection_buffer import DetectionBuffer
+from detection_db import SqliteDetectionStore
+from detection_log import DetectionSink
+from detection_store import LEGACY_TEST_LABELS, DetectionStore, migrate_csv
+from face_store import EncodingStore, build_templates
+from intrusion import IntrusionAlerter
+from matcher import UNKNOWN
+from recognition import RecognitionPipeline, RecognizerPool
+from recorder import ContinuousRecorder, EventRecorder
+from recordings import RecordingIndex, RetentionManager
+from service_client import DEFAULT_HOST, DEFAULT_PORT
+from stats import DetectionRollups, DetectionStats
+
+logger = logging.getLogger(__name__)
+
+# CallMeBot API configuration
+CALLMEBOT_API_KEY = os.environ.get("CALLMEBOT_API_KEY", "7646080")
+WHATSAPP_NUMBER = os.environ.get("WHATSAPP_NUMBER", "+2349160947850")
+
+# Log the same person (or the same unknown face track) at most once per window
+DEDUP_COOLDOWN_SECONDS = 60
+
+AUTO_RECORD_MODES = ("off", "unknown", "motion")  # "motion" records on unknown faces and on motion
+DEFAULT_SETTINGS = {
+    "monitoring": False,
+    "alarm_active": False,
+    "auto_record": "unknown",
+    "continuous_recording": False,
+    "max_latency": 1.0,
+}
+
+
+class CameraUnit:
+    """Capture, recognition pipeline and recorders for one camera.
+
+    Every unit's pipeline submits to the service's shared ``RecognizerPool``,
+    so a camera adds a capture thread and a motion gate, not another copy of
+    dlib and the gallery. Opening a camera and joining writer threads can
+    take seconds, so ``start()`` and ``stop()`` only hold ``lock`` (the
+    service's) while swapping the unit's parts in or out.
+    """
+
+    def __init__(self, config, pool, recording_index, detector="pyramid", lock=None):
+        self.name = config.name
+        self.source = config.source
+        self.pool = pool
+        self.detector = detector
+        self.recording_index = recording_index
+        self.camera = None
+        self.recognizer = None
+        self.recorder = None
+        self.continuous_recorder = None
+        self.recording = False
+        self.last_motion = None
+        self._preview = None
+        self._lock = threading.RLock() if lock is None else lock
+
+    @property
+    def running(self):
+        return self.camera is not None and self.camera.running
+
+    def start(self, max_latency):
+        if self.camera is not None:
+            return True
+        camera = CameraStream(src=self.source)
+        if not camera.start():
+            logger.error(f"Failed to access camera {self.name} ({self.source})")
+            return False
+        # Detection and encoding run in the shared worker processes
+        recognizer = RecognitionPipeline(
+            camera, max_latency=max_latency, pool=self.pool, name=self.name, pyramid=self.detector == "pyramid"
+        )
+        recognizer.start()
+        # Keeps a few seconds of pre-roll and writes event clips on its own thread
+        recorder = EventRecorder(camera, index=self.recording_index, name=self.name)
+        recorder.start()
+        with self._lock:
+            self.camera, self.recognizer, self.recorder = camera, recognizer, recorder
+            self.last_motion = recognizer.last_motion
+        return True
+
+    def stop(self):
+        with self._lock:
+            camera, recognizer, recorder = self.camera, self.recognizer, self.recorder
+            if camera is None:
+                return
+            self.camera = self.recognizer = self.recorder = None
+            self.recording = False
+            self._preview = None
+        self.set_continuous(False)
+        recorder.stop()
+        recognizer.stop()
+        camera.stop()
+
+    def set_continuous(self, on):
+        # Fixed-length segments while monitoring, if enabled
+        with self._lock:
+            camera, continuous_recorder = self.camera, self.continuous_recorder
+            if not on:
+                self.continuous_recorder = None
+        if on and camera is not None and continuous_recorder is None:
+            continuous_recorder = ContinuousRecorder(camera, index=self.recording_index, name=self.name)
+            continuous_recorder.start()
+            with self._lock:
+                self.continuous_recorder = continuous_recorder
+        elif not on and continuous_recorder is not None:
+            continuous_recorder.stop()
+
+    def annotated_frame(self, max_latency):
+        camera, recognizer = self.camera, self.recognizer
+        frame = camera.latest() if camera is not None else None
+        if frame is None:
+            return None, None
+        # The ring frame is shared with other consumers, so draw on a copy
+        img = frame.image.copy()
+        latest = recognizer.latest if recognizer is not None else None
+        if latest is not None and frame.timestamp - latest.timestamp < 2 * max_latency:
+            for face in latest.faces:
+                top, right, bottom, left = face.box
+                cv2.rectangle(img, (left, top), (right, bottom), (0, 255, 0), 2)
+                # Faces still waiting for a good enough crop have no identity yet
+                cv2.putText(img, face.name or "...", (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        return frame, img
+
+    def preview_jpeg(self, max_latency, quality=75):
+        """Latest frame with recognition boxes as JPEG, encoded once per frame however many clients poll."""
+        camera = self.camera
+        latest = camera.latest() if camera is not None else None
+        if latest is None:
+            return None
+        preview = self._preview
+        if preview is not None and preview[0] == latest.seq:
+            return preview[1]
+        frame, img = self.annotated_frame(max_latency)
+        if frame is None:
+            return None
+        ok, jpeg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            return None
+        self._preview = (frame.seq, jpeg.tobytes())
+        return self._preview[1]
+
+    def status(self):
+        recognizer, recorder = self.recognizer, self.recorder
+        status = {
+            "source": str(self.source),
+            "running": self.running,
+            "recording": self.recording,
+            "continuous_recording": self.continuous_recorder is not None,
+        }
+        if recognizer is not None:
+            status["recognition"] = recognizer.stats()
+        last_clip = recorder.last_clip if recorder is not None else None
+        if last_clip is not None:
+            status["last_clip"] = last_clip._asdict()
+        return status
+
+
+class SecurityService:
+    """Owns the cameras, recognition, detection storage, recording and alerts.
+
+    Runs independently of any browser: a loop thread turns recognition
+    results into logged detections, intruder alerts and event clips while
+    monitoring is on. Each configured camera is a ``CameraUnit``; all of
+    them share one ``RecognizerPool`` of ``max_workers`` processes.
+    Dashboards read state and send settings through the HTTP API in
+    ``serve()`` (see ``service_client.ServiceClient``), so UI reruns never
+    touch the recognition pipeline.
+    """
+
+    def __init__(self, cameras=None, faces_dir="known_faces", backend="columnar", csv_path="detections.csv",
+                 max_workers=2, detector="pyramid", recordings_max_gb=20.0, recordings_max_age_days=30,
+                 recordings_alert_max_age_days=90):
+        self.faces_dir = faces_dir
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.pool = RecognizerPool(self._load_templates(), tolerance=0.6, max_workers=max_workers)
+
+        if backend == "sqlite":
+            self.store = SqliteDetectionStore("detections.db")
+        else:
+            self.store = DetectionStore("detections")
+        # The legacy CSV is imported once, without its test rows
+        migrated = migrate_csv(self.store, csv_path, skip_labels=LEGACY_TEST_LABELS)
+        if migrated:
+            logger.info(f"Imported {migrated} detections from {csv_path}")
+
+        # Running per-day counters and trend buckets; history is only rescanned if their files are missing
+        self.stats = DetectionStats("detection_stats.json")
+        if not self.stats.loaded:
+            self.stats.rebuild(self.store)
+        self.rollups = DetectionRollups("detection_rollups.json")
+        if not self.rollups.loaded:
+            self.rollups.rebuild(self.store)
+
+        self.recording_index = RecordingIndex("video_records/recordings.db")
+        self.retention = RetentionManager(
+            self.recording_index,
+            {"video_records/continuous": "segment", "video_records": "clip", "snapshots": "snapshot"},
+            max_age_days=recordings_max_age_days,
+            alert_max_age_days=recordings_alert_max_age_days,
+            max_bytes=int(recordings_max_gb * 1024 ** 3),
+        )
+        self.sink = DetectionSink(self.store, observers=[self.stats, self.rollups, self.recording_index])
+        self.dispatcher = AlertDispatcher(CallMeBotTransport(WHATSAPP_NUMBER, CALLMEBOT_API_KEY))
+        self.intrusion_alerter = IntrusionAlerter(self.dispatcher)
+        self.seen_faces = DetectionDeduper(cooldown=DEDUP_COOLDOWN_SECONDS, max_entries=1024)
+        # Detections the sink may not have flushed yet, for exports
+        self.detections = DetectionBuffer(max_rows=100000)
+
+        self._lock = threading.RLock()
+        # Serialises starting and stopping cameras, which happens outside _lock
+        self._lifecycle = threading.Lock()
+        cameras = cameras if cameras is not None else load_camera_configs()
+        self.units = {
+            config.name: CameraUnit(config, self.pool, self.recording_index, detector, self._lock)
+            for config in cameras
+        }
+        self.monitoring_since = None
+        self._stop = threading.Event()
+        self._thread = None
+        # Known-face reloads re-encode changed photos, which can take a while
+        self.faces = {"identities": len(self.pool.templates), "reloading": False, "last_error": None}
+        self._reload_thread = None
+
+    def _load_templates(self):
+        # Encodings are cached on disk in face_cache/; only new or changed images are re-encoded
+        encodings, labels, missing = EncodingStore(self.faces_dir).load()
+        for file in missing:
+            logger.warning(f"No face encoding found for {file}")
+        if not len(encodings):
+            logger.error(f"No known faces loaded. Please add images to the '{self.faces_dir}' directory.")
+        # One template (centroid + medoids + threshold) per person, however many photos they have
+        return build_templates(encodings, labels, tolerance=0.6)
+
+    def _unit(self, camera=None):
+        if camera is None:
+            return next(iter(self.units.values()))
+        unit = self.units.get(camera)
+        if unit is None:
+            raise ValueError(f"Unknown camera: {camera}")
+        return unit
+
+    # --------------------------
+    # Lifecycle
+    # --------------------------
+    def start(self):
+        self.retention.start()
+        self._thread = threading.Thread(target=self._run, name="security-service", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lifecycle:
+            self._stop_monitoring()
+        self.retention.stop()
+        self.sink.close()
+        self.dispatcher.close()
+
+    def _start_monitoring(self):
+        """Start every camera; monitoring is on if at least one of them opened."""
+        self.pool.start()
+        started = [unit.start(self.settings["max_latency"]) for unit in self.units.values()]
+        if not any(started):
+            self.pool.stop()
+            return False
+        with self._lock:
+            if self.monitoring_since is None:
+                self.monitoring_since = time.time()
+        return True
+
+    def _stop_monitoring(self):
+        for unit in self.units.values():
+            unit.stop()
+        self.pool.stop()
+        with self._lock:
+            self.monitoring_since = None
+            self.seen_faces.clear()  # Clear seen faces when monitoring stops
+            self.intrusion_alerter.reset()
+
+    def update_settings(self, **changes):
+        """Apply setting changes and start or stop whatever they switch."""
+        unknown = set(changes) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        if changes.get("auto_record", self.settings["auto_record"]) not in AUTO_RECORD_MODES:
+            raise ValueError(f"auto_record must be one of {AUTO_RECORD_MODES}")
+        # Cameras are opened and closed outside _lock so status() never waits on them
+        with self._lifecycle:
+            with self._lock:
+                was_monitoring = self.monitoring_since is not None
+                self.settings.update(changes)
+                settings = dict(self.settings)
+            # Only a switch of the monitoring setting opens or closes cameras
+            if settings["monitoring"] and not was_monitoring:
+                started = self._start_monitoring()
+                with self._lock:
+                    self.settings["monitoring"] = started
+            elif not settings["monitoring"] and was_monitoring:
+                self._stop_monitoring()
+            for unit in self.units.values():
+                with self._lock:
+                    if unit.recognizer is not None:
+                        unit.recognizer.scheduler.max_latency = float(settings["max_latency"])
+                unit.set_continuous(settings["continuous_recording"])
+            with self._lock:
+                return dict(self.settings)
+
+    def reload_faces(self):
+        """Re-read known_faces/ on a background thread; False if a reload is already running.
+
+        Running workers are replaced with ones holding the new gallery once
+        the changed photos are encoded; ``status()["faces"]`` shows progress.
+        """
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self.faces["reloading"] = True
+            self._reload_thread = threading.Thread(target=self._reload_faces, name="face-reload", daemon=True)
+            self._reload_thread.start()
+            return True
+
+    def _reload_faces(self):
+        try:
+            templates = self._load_templates()
+            with self._lifecycle:
+                self.pool.restart(templates)
+            self.faces.update(identities=len(templates), last_error=None)
+        except Exception as e:
+            logger.exception("Failed to reload known faces")
+            self.faces["last_error"] = str(e)
+        finally:
+            self.faces["reloading"] = False
+
+    # --------------------------
+    # Recognition loop
+    # --------------------------
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                # Monitoring stops clear a unit's fields one by one, so only use what was set under the lock
+                units = [
+                    (unit, unit.recognizer, unit.recorder)
+                    for unit in self.units.values()
+                    if unit.recognizer is not None and unit.recorder is not None
+                ]
+                settings = dict(self.settings)
+            if not units:
+                self._stop.wait(0.2)
+                continue
+
+            for unit, recognizer, recorder in units:
+                for result in recognizer.drain():
+                    try:
+                        self._handle_result(result, recorder, settings)
+                    except Exception:
+                        # One bad result must not stop logging and alerts for good
+                        logger.exception(f"Failed to handle a recognition result from {unit.name}")
+                if settings["auto_record"] == "motion" and recognizer.last_motion not in (None, unit.last_motion):
+                    unit.last_motion = recognizer.last_motion
+                    recorder.trigger("motion", unit.last_motion)
+
+            # Send pending intruder alerts even if the face has left the frame
+            try:
+                if settings["alarm_active"]:
+                    self.intrusion_alerter.flush(time.time())
+                else:
+                    self.intrusion_alerter.reset()
+            except Exception:
+                logger.exception("Failed to send intruder alerts")
+            self._stop.wait(0.05)
+
+    def _handle_result(self, result, recorder, settings):
+        if settings["alarm_active"]:
+            # Faces carry crops taken from the frame recognition ran on
+            self.intrusion_alerter.observe(result)
+        # Only faces whose track has enough votes count; a single encoding can be a bad crop
+        faces = [face for face in result.faces if face.confirmed]
+        # Start (or extend) an event clip around unknown faces
+        if settings["auto_record"] != "off" and any(face.name == UNKNOWN for face in faces):
+            recorder.trigger("unknown", result.timestamp)
+
+        detected_at = datetime.fromtimestamp(result.timestamp)
+        for face in faces:
+            # Only log people not already logged within the cooldown window
+            if self.seen_faces.should_log(detection_key(face.name, face.track_id), result.timestamp):
+                alert_triggered = "Yes" if face.name == UNKNOWN else "No"
+                self.detections.append(detected_at, face.name, alert_triggered)
+                # Queue for the background detection writer
+                self.sink.write(detected_at, face.name, alert_triggered)
+
+    # --------------------------
+    # Frames and actions
+    # --------------------------
+    def preview_jpeg(self, camera=None, quality=75):
+        return self._unit(camera).preview_jpeg(self.settings["max_latency"], quality)
+
+    def snapshot(self, camera=None):
+        """Save the annotated frame to snapshots/ and queue it for WhatsApp."""
+        unit = self._unit(camera)
+        frame, img = unit.annotated_frame(self.settings["max_latency"])
+        if frame is None:
+            raise RuntimeError("Monitoring is not active")
+        os.makedirs("snapshots", exist_ok=True)
+        name = f"snapshot_{unit.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+        snapshot_path = os.path.join("snapshots", name)
+        ok, jpeg = cv2.imencode(".jpg", img)
+        if not ok:
+            raise RuntimeError("Failed to encode snapshot")
+        with open(snapshot_path, "wb") as file:
+            file.write(jpeg.tobytes())
+        self.recording_index.add(snapshot_path, "snapshot", frame.timestamp, frame.timestamp)
+        # Delivery happens on the dispatcher thread
+        self.dispatcher.submit(Alert(f"Snapshot ({unit.name})", jpeg.tobytes(), name))
+        return snapshot_path
+
+    def record(self, on, camera=None):
+        """Start or stop a manual clip."""
+        with self._lock:
+            unit = self._unit(camera)
+            if unit.recorder is None:
+                raise RuntimeError("Monitoring is not active")
+            if on:
+                unit.recorder.hold()
+            else:
+                unit.recorder.release()
+            unit.recording = bool(on)
+            return unit.recording
+
+    def test_alert(self):
+        self.dispatcher.submit(Alert("Alert Test", key="test"))
+
+    # --------------------------
+    # Reads
+    # --------------------------
+    def status(self):
+        with self._lock:
+            status = {
+                "settings": dict(self.settings),
+                "monitoring_since": self.monitoring_since,
+                "cameras": {name: unit.status() for name, unit in self.units.items()},
+                "workers": {
+                    "max": self.pool.max_workers,
+                    "in_flight": dict(self.pool.in_flight),
+                    "encode_batches": self.pool.batcher.batches,
+                    "faces_encoded": self.pool.batcher.encoded,
+                },
+            }
+        status["faces"] = dict(self.faces)
+        status["alerts"] = {
+            "sent": self.dispatcher.sent,
+            "failed": self.dispatcher.failed,
+            "queued": self.dispatcher.queued,
+            "last_error": self.dispatcher.last_error,
+        }
+        return status
+
+    def summary(self, day=None):
+        summary = self.stats.summary(day)._asdict()
+        if summary["last_alert"] is not None:
+            summary["last_alert"] = summary["last_alert"].isoformat()
+        return summary
+
+    def load_detections(self, start=None, end=None):
+        # Only the day partitions from `start` onwards are read
+        df = self.store.query(start=start, end=end)
+        if end is not None:
+            return df
+        # Detections are persisted by the sink; only add the ones it hasn't flushed yet
+        last_stored = self.store.last_timestamp()
+        if last_stored is None:
+            last_stored = start
+        elif start is not None:
+            last_stored = max(last_stored, pd.Timestamp(start))
+        pending = self.detections.frame(start=last_stored)
+        if pending.empty:
+            return df
+        return pending if df.empty else pd.concat([df, pending], ignore_index=True)
+
+
+# --------------------------
+# HTTP API
+# --------------------------
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Local HTTP API over a ``SecurityService`` (``self.server.service``).
+
+    GET ``/status``, ``/summary``, ``/frame.jpg``, ``/recent.csv``,
+    ``/series.csv`` and ``/detections.csv``; POST ``/settings``,
+    ``/snapshot``, ``/record``, ``/test-alert`` and ``/reload-faces``.
+    """
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, payload, status=200):
+        self._send(status, json.dumps(payload, default=str).encode("utf-8"), "application/json")
+
+    def _csv(self, df, headers=None):
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False)
+        self._send(200, buffer.getvalue().encode("utf-8"), "text/csv", headers)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/status":
+                self._json(service.status())
+            elif url.path == "/summary":
+                self._json(service.summary(query.get("day")))
+            elif url.path == "/frame.jpg":
+                jpeg = service.preview_jpeg(query.get("camera"))
+                if jpeg is None:
+                    self._json({"error": "Monitoring is not active"}, status=404)
+                else:
+                    self._send(200, jpeg, "image/jpeg")
+            elif url.path == "/recent.csv":
+                self._csv(service.store.recent(int(query.get("limit", 10))))
+            elif url.path == "/series.csv":
+                start = query.get("start")
+                if start is None:
+                    start = service.rollups.first_timestamp() or pd.Timestamp.now().normalize()
+                series = service.rollups.series(start, query.get("end"))
+                self._csv(series, {"X-Resolution": series.attrs["resolution"]})
+            elif url.path == "/detections.csv":
+                self._csv(service.load_detections(query.get("start"), query.get("end")))
+            else:
+                self._json({"error": f"Not found: {url.path}"}, status=404)
+        except (ValueError, TypeError) as e:
+            self._json({"error": str(e)}, status=400)
+
+    def do_POST(self):
+        service = self.server.service
+        path = urlparse(self.path).path
+        try:
+            body = self._body()
+            if path == "/settings":
+                self._json(service.update_settings(**body))
+            elif path == "/snapshot":
+                self._json({"path": service.snapshot(body.get("camera"))})
+            elif path == "/record":
+                self._json({"recording": service.record(bool(body.get("on", True)), body.get("camera"))})
+            elif path == "/test-alert":
+                service.test_alert()
+                self._json({"queued": True})
+            elif path == "/reload-faces":
+                # Answers straight away; the reload runs in the background
+                self._json({"reloading": service.reload_faces()}, status=202)
+            else:
+                self._json({"error": f"Not found: {path}"}, status=404)
+        except (ValueError, TypeError) as e:
+            self._json({"error": str(e)}, status=400)
+        except RuntimeError as e:
+            self._json({"error": str(e)}, status=409)
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run camera capture, recognition, logging and alerts as a service.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--camera", action="append", default=[], metavar="NAME=SOURCE",
+                        help="Camera to watch, e.g. front_door=0 or garage=rtsp://...; repeat for more cameras "
+                             "(default: the cameras in --cameras-file)")
+    parser.add_argument("--cameras-file", default="cameras.json")
+    parser.add_argument("--workers", type=int, default=2, help="Recognition processes shared by all cameras")
+    parser.add_argument("--detector", choices=["pyramid", "scaled"], default="pyramid",
+                        help="pyramid: coarse pass plus full resolution around candidates and motion; "
+                             "scaled: one pass on a half-size frame (cheapest)")
+    parser.add_argument("--faces-dir", default="known_faces")
+    parser.add_argument("--backend", choices=["columnar", "sqlite"], default=os.environ.get("DETECTION_BACKEND", "columnar"))
+    parser.add_argument("--monitor", action="store_true", help="Start monitoring immediately")
+    parser.add_argument("--alarm", action="store_true", help="Start with the alarm system active")
+    parser.add_argument("--recordings-max-gb", type=float, default=float(os.environ.get("RECORDINGS_MAX_GB", "20")))
+    parser.add_argument("--recordings-max-age-days", type=float,
+                        default=float(os.environ.get("RECORDINGS_MAX_AGE_DAYS", "30")))
+    parser.add_argument("--recordings-alert-max-age-days", type=float,
+                        default=float(os.environ.get("RECORDINGS_ALERT_MAX_AGE_DAYS", "90")))
+    args = parser.parse_args()
+
+    cameras = []
+    for entry in args.camera:
+        name, sep, source = entry.partition("=")
+        if not sep:
+            parser.error(f"--camera expects NAME=SOURCE, got {entry!r}")
+        cameras.append(CameraConfig(name, parse_source(source)))
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    service = SecurityService(
+        cameras=cameras or load_camera_configs(args.cameras_file),
+        faces_dir=args.faces_dir,
+        backend=args.backend,
+        max_workers=args.workers,
+        detector=args.detector,
+        recordings_max_gb=args.recordings_max_gb,
+        recordings_max_age_days=args.recordings_max_age_days,
+        recordings_alert_max_age_days=args.recordings_alert_max_age_days,
+    )
+    service.start()
+    if args.monitor or args.alarm:
+        service.update_settings(monitoring=args.monitor, alarm_active=args.alarm)
+    server = serve(service, args.host, args.port)
+    logger.info(f"Security service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import io
+
+import pandas as pd
+import requests
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class ServiceUnavailable(Exception):
+    """The security service could not be reached or rejected the request."""
+
+
+class ServiceClient:
+    """Read-only views and settings for a running ``security_service``.
+
+    Every call is a short local HTTP request with a timeout; a stopped
+    service surfaces as ``ServiceUnavailable`` instead of hanging the UI.
+    Switching monitoring on waits for the cameras to open, so settings
+    changes get the longer ``settings_timeout``.
+    """
+
+    def __init__(self, base_url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=3.0, settings_timeout=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.settings_timeout = settings_timeout
+        self.session = requests.Session()
+
+    def _request(self, method, path, timeout=None, **kwargs):
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            raise ServiceUnavailable(f"Security service not reachable at {self.base_url}: {e}") from e
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            raise ServiceUnavailable(message)
+        return response
+
+    def _frame(self, path, params=None):
+        response = self._request("GET", path, params=params)
+        df = pd.read_csv(io.StringIO(response.text), parse_dates=["timestamp"])
+        return df, response
+
+    # --------------------------
+    # Reads
+    # --------------------------
+    def status(self):
+        return self._request("GET", "/status").json()
+
+    def summary(self, day=None):
+        return self._request("GET", "/summary", params={"day": day} if day else None).json()
+
+    def frame_jpeg(self, camera=None):
+        """Latest annotated frame of ``camera`` (default: the first) as JPEG bytes, or None while it is off."""
+        try:
+            return self._request("GET", "/frame.jpg", params={"camera": camera} if camera else None).content
+        except ServiceUnavailable:
+            return None
+
+    def recent(self, limit=10):
+        return self._frame("/recent.csv", {"limit": limit})[0]
+
+    def series(self, start=None, end=None):
+        params = {key: str(value) for key, value in (("start", start), ("end", end)) if value is not None}
+        df, response = self._frame("/series.csv", params)
+        df.attrs["resolution"] = response.headers.get("X-Resolution", "")
+        return df
+
+    def detections_csv(self, start=None, end=None):
+        params = {key: str(value) for key, value in (("start", start), ("end", end)) if value is not None}
+        return self._request("GET", "/detections.csv", params=params).content
+
+    # --------------------------
+    # Commands
+    # --------------------------
+    def update_settings(self, **changes):
+        return self._request("POST", "/settings", timeout=self.settings_timeout, json=changes).json()
+
+    def snapshot(self, camera=None):
+        return self._request("POST", "/snapshot", json={"camera": camera}).json()["path"]
+
+    def record(self, on, camera=None):
+        return self._request("POST", "/record", json={"on": on, "camera": camera}).json()["recording"]
+
+    def test_alert(self):
+        self._request("POST", "/test-alert")
+
+    def reload_faces(self):
+        """Start re-reading known_faces/ in the service; False if a reload is already running."""
+        return self._request("POST", "/reload-faces").json()["reloading"]
@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from matcher import UNKNOWN
+
+logger = logging.getLogger(__name__)
+
+DaySummary = namedtuple("DaySummary", ["total", "intrusions", "known", "success_pct", "vuln_pct", "last_alert"])
+
+
+class DetectionStats:
+    """Running per-day counters for the dashboard summary.
+
+    Each detection bumps a per-day total and a per-label count, and updates
+    the last-alert time -- O(1) work, no history scan.
+    Counters are saved to ``path`` at most every ``persist_interval`` seconds
+    (and on ``close()``), so a restart picks up where it left off; only
+    ``retention_days`` days are kept. Plug it into
+    ``DetectionSink(observers=...)`` so it sees exactly the rows that were
+    stored.
+    """
+
+    def __init__(self, path="detection_stats.json", retention_days=90, persist_interval=5.0):
+        self.path = path
+        self.retention_days = retention_days
+        self.persist_interval = persist_interval
+        self.days = {}
+        self.last_alert = None
+        self._dirty = False
+        self._last_persist = 0.0
+        self._lock = threading.Lock()
+        self.loaded = self._load()
+
+    # --------------------------
+    # Persistence
+    # --------------------------
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable stats file {self.path}: {e}")
+            return False
+        self.days = state.get("days", {})
+        self.last_alert = pd.Timestamp(state["last_alert"]) if state.get("last_alert") else None
+        return True
+
+    def persist(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not self._dirty or (not force and now - self._last_persist < self.persist_interval):
+                return
+            # Serialise under the lock; the sink thread may be updating counters
+            state = json.dumps({
+                "days": self.days,
+                "last_alert": self.last_alert.isoformat() if self.last_alert is not None else None,
+            })
+            self._dirty = False
+            self._last_persist = now
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(state)
+        os.replace(tmp, self.path)
+
+    def rebuild(self, store):
+        """Recount from a detection store; only needed when no stats file exists."""
+        start = pd.Timestamp.now().normalize() - pd.Timedelta(days=self.retention_days - 1)
+        df = store.query(start=start)
+        with self._lock:
+            self.days = {}
+        self.record_batch(zip(df["timestamp"], df["label"].astype(str), df["alert_triggered"]))
+        self.last_alert = store.last_timestamp(UNKNOWN)
+        self.persist(force=True)
+
+    # --------------------------
+    # Updates
+    # --------------------------
+    def record_batch(self, rows):
+        """Count ``(timestamp, label, alert_triggered)`` rows."""
+        with self._lock:
+            for timestamp, label, alert in rows:
+                timestamp = pd.Timestamp(timestamp)
+                if isinstance(alert, str):
+                    alert = alert == "Yes"
+                day = self.days.get(timestamp.strftime("%Y-%m-%d"))
+                if day is None:
+                    day = self.days[timestamp.strftime("%Y-%m-%d")] = {"total": 0, "labels": {}}
+                day["total"] += 1
+                day["labels"][label] = day["labels"].get(label, 0) + 1
+                if label == UNKNOWN and (self.last_alert is None or timestamp > self.last_alert):
+                    self.last_alert = timestamp
+            if len(self.days) > self.retention_days:
+                for old in sorted(self.days)[:-self.retention_days]:
+                    del self.days[old]
+            self._dirty = True
+        self.persist()
+
+    def close(self):
+        self.persist(force=True)
+
+    # --------------------------
+    # Reads
+    # --------------------------
+    def summary(self, day=None):
+        day = (pd.Timestamp.now() if day is None else pd.Timestamp(day)).strftime("%Y-%m-%d")
+        with self._lock:
+            counts = self.days.get(day, {"total": 0, "labels": {}})
+            total = counts["total"]
+            intrusions = counts["labels"].get(UNKNOWN, 0)
+            last_alert = self.last_alert
+        known = total - intrusions
+        success_pct = int(known / total * 100) if total > 0 else 0
+        vuln_pct = int(intrusions / total * 100) if total > 0 else 0
+        return DaySummary(total, intrusions, known, success_pct, vuln_pct, last_alert)
+
+
+# --------------------------
+# Time-bucket rollups
+# --------------------------
+# (name, bucket width in seconds, how long buckets are kept in seconds)
+RESOLUTIONS = (
+    ("minute", 60, 2 * 86400),
+    ("hour", 3600, 90 * 86400),
+    ("day", 86400, None),
+)
+
+
+class DetectionRollups:
+    """Per-label detection counts in minute, hour and day buckets.
+
+    Every detection increments one bucket at each resolution, so the trend
+    chart never has to touch raw rows. ``series()`` picks the finest
+    resolution that still covers the requested range and fits in
+    ``max_points`` buckets. Minute buckets are kept for two days and hour
+    buckets for 90; day buckets are kept forever. Saved to ``path`` like
+    ``DetectionStats``.
+    """
+
+    def __init__(self, path="detection_rollups.json", persist_interval=5.0, max_points=1500):
+        self.path = path
+        self.persist_interval = persist_interval
+        self.max_points = max_points
+        self.buckets = {name: {} for name, _, _ in RESOLUTIONS}
+        self._dirty = False
+        self._last_persist = 0.0
+        self._lock = threading.Lock()
+        self.loaded = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable rollups file {self.path}: {e}")
+            return False
+        for name, _, _ in RESOLUTIONS:
+            self.buckets[name] = {int(start): counts for start, counts in state.get(name, {}).items()}
+        return True
+
+    def persist(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not self._dirty or (not force and now - self._last_persist < self.persist_interval):
+                return
+            state = json.dumps({name: {str(start): counts for start, counts in buckets.items()}
+                                for name, buckets in self.buckets.items()})
+            self._dirty = False
+            self._last_persist = now
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(state)
+        os.replace(tmp, self.path)
+
+    def rebuild(self, store):
+        """Recount from a detection store; only needed when no rollups file exists."""
+        df = store.query()
+        with self._lock:
+            self.buckets = {name: {} for name, _, _ in RESOLUTIONS}
+        self.record_batch(zip(df["timestamp"], df["label"].astype(str), df["alert_triggered"]))
+        self.persist(force=True)
+
+    def record_batch(self, rows):
+        """Count ``(timestamp, label, alert_triggered)`` rows."""
+        with self._lock:
+            newest = None
+            for timestamp, label, _ in rows:
+                # Naive local wall-clock time, bucketed as if it were UTC
+                seconds = pd.Timestamp(timestamp).value // 1_000_000_000
+                newest = seconds if newest is None else max(newest, seconds)
+                for name, width, _ in RESOLUTIONS:
+                    counts = self.buckets[name].setdefault(seconds - seconds % width, {})
+                    counts[label] = counts.get(label, 0) + 1
+            if newest is None:
+                return
+            for name, _, keep in RESOLUTIONS:
+                if keep is not None:
+                    cutoff = newest - keep
+                    for start in [s for s in self.buckets[name] if s < cutoff]:
+                        del self.buckets[name][start]
+            self._dirty = True
+        self.persist()
+
+    def close(self):
+        self.persist(force=True)
+
+    def first_timestamp(self):
+        with self._lock:
+            days = self.buckets["day"]
+            return pd.Timestamp(min(days), unit="s") if days else None
+
+    def resolution_for(self, start, end):
+        """Finest resolution that covers ``[start, end)`` in at most ``max_points`` buckets."""
+        span = (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds()
+        age = (pd.Timestamp.now() - pd.Timestamp(start)).total_seconds()
+        for name, width, keep in RESOLUTIONS:
+            if span / width <= self.max_points and (keep is None or age <= keep):
+                return name, width
+        return RESOLUTIONS[-1][:2]
+
+    def series(self, start, end=None):
+        """``timestamp, label, count`` rows for the trend chart over ``[start, end)``."""
+        end = pd.Timestamp.now() if end is None else pd.Timestamp(end)
+        name, width = self.resolution_for(start, end)
+        start_s = pd.Timestamp(start).value // 1_000_000_000
+        end_s = end.value // 1_000_000_000
+        with self._lock:
+            rows = [
+                (bucket, label, count)
+                for bucket, counts in self.buckets[name].items()
+                if start_s - start_s % width <= bucket < end_s
+                for label, count in counts.items()
+            ]
+        df = pd.DataFrame(rows, columns=["timestamp", "label", "count"])
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
+        df.attrs["resolution"] = name
+        return df.sort_values("timestamp", ignore_index=True)
@@ -0,0 +1,201 @@
+import itertools
+import threading
+from dataclasses import dataclass, field
+
+from quality import QualityGate
+
+
+def iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    inter = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+def associate(track_boxes, detection_boxes, min_iou=0.3):
+    """Greedy IoU matching; returns {detection index: track index}."""
+    pairs = []
+    for t, track_box in enumerate(track_boxes):
+        for d, detection_box in enumerate(detection_boxes):
+            overlap = iou(track_box, detection_box)
+            if overlap >= min_iou:
+                pairs.append((overlap, t, d))
+    pairs.sort(reverse=True)
+    used_tracks, matches = set(), {}
+    for _, t, d in pairs:
+        if t not in used_tracks and d not in matches:
+            used_tracks.add(t)
+            matches[d] = t
+    return matches
+
+
+@dataclass
+class Track:
+    track_id: int
+    box: tuple
+    first_seen: float
+    last_seen: float
+    name: str = None
+    distance: float = float("inf")
+    last_encoded: float = None
+    hits: int = 0
+    # (quality score, timestamp, name, distance) of the best encodings so far
+    votes: list = field(default_factory=list)
+
+    @property
+    def confirmed(self):
+        return self.name is not None
+
+
+# Shared by every tracker so track ids stay unique across cameras
+_TRACK_IDS = itertools.count(1)
+
+class FaceTracker:
+    """IoU tracker that lets confirmed faces skip re-encoding.
+
+    Before a frame is recognised, ``hints()`` lists the boxes of confirmed
+    tracks that are not yet due for re-verification; the worker reuses their
+    identity for any detection overlapping one of those boxes instead of
+    encoding it. New tracks, tracks that were lost and re-found, and tracks
+    older than ``reverify_after`` seconds since their last encoding are
+    encoded and matched as usual. Tracks unseen for ``max_age`` seconds are
+    dropped.
+
+    Faces are encoded selectively (``select()``): crops failing the
+    ``quality.QualityGate`` are deferred, unless their track has had nothing
+    better for ``max_defer`` seconds, and once a track holds ``max_votes``
+    encodings only a better crop than its worst one is encoded, apart from
+    the re-verification every ``reverify_after`` seconds. A track's name is
+    the quality-weighted vote of those encodings, so one blurred frame
+    cannot flip a person to "Unknown". A track is confirmed, and starts
+    receiving hints, after ``min_votes`` encodings; votes older than
+    ``vote_ttl`` seconds expire, so a new face in an old track takes over
+    within ``vote_ttl`` seconds.
+    """
+
+    def __init__(self, min_iou=0.3, max_age=2.0, reverify_after=5.0, gate=None, min_votes=2, max_votes=3,
+                 max_defer=3.0, vote_ttl=15.0):
+        self.min_iou = min_iou
+        self.max_age = max_age
+        self.reverify_after = reverify_after
+        self.gate = QualityGate() if gate is None else gate
+        self.min_votes = min_votes
+        self.max_votes = max_votes
+        self.max_defer = max_defer
+        self.vote_ttl = vote_ttl
+        self.tracks = {}
+        self.encoded = 0
+        self.reused = 0
+        self.deferred = 0
+        self.skipped = 0
+        self._ids = _TRACK_IDS
+        self._lock = threading.Lock()
+
+    def hints(self, now):
+        """(track_id, box, name, distance) for tracks whose identity can be
+        reused at time ``now``."""
+        with self._lock:
+            return [
+                (track.track_id, track.box, track.name, track.distance)
+                for track in self.tracks.values()
+                if track.confirmed and len(track.votes) >= self.min_votes
+                and now - track.last_seen <= self.max_age
+                and now - track.last_encoded < self.reverify_after
+            ]
+
+    def select(self, faces, timestamp):
+        """Which of ``faces`` (not yet encoded, with ``quality``) are worth encoding."""
+        with self._lock:
+            tracks = [track for track in self.tracks.values() if timestamp - track.last_seen <= self.max_age]
+            matches = associate([t.box for t in tracks], [face.box for face in faces], self.min_iou)
+            return [
+                self._wanted(tracks[matches[i]] if i in matches else None, face.quality, timestamp)
+                for i, face in enumerate(faces)
+            ]
+
+    def _wanted(self, track, quality, timestamp):
+        if quality is None:
+            return True
+        if track is not None and track.last_encoded is not None \
+                and timestamp - track.last_encoded >= self.reverify_after:
+            # Re-verification is what lets a track change identity, so it never waits for a better crop
+            return True
+        votes = [vote for vote in track.votes if timestamp - vote[1] <= self.vote_ttl] if track is not None else []
+        if self.gate.check(quality) is not None:
+            # A face that never gets better is still identified, just later
+            if track is None or votes or timestamp - track.first_seen < self.max_defer:
+                self.deferred += 1
+                return False
+            return True
+        if len(votes) >= self.max_votes and quality.score <= min(vote[0] for vote in votes):
+            self.skipped += 1
+            return False
+        return True
+
+    def _vote(self, track, face, timestamp):
+        score = face.quality.score if face.quality is not None else 0.0
+        votes = [vote for vote in track.votes if timestamp - vote[1] <= self.vote_ttl]
+        votes.sort(key=lambda vote: (vote[0], vote[1]), reverse=True)
+        # The newest encoding always counts, even when it is worse than the ones it replaces
+        track.votes = votes[:self.max_votes - 1] + [(score, timestamp, face.name, face.distance)]
+        # Scores can all be 0 for faces that only passed by waiting out max_defer
+        weights = {}
+        for score, _, name, _ in track.votes:
+            weights[name] = weights.get(name, 0.0) + score + 1e-6
+        track.name = max(weights, key=weights.get)
+        track.distance = min(vote[3] for vote in track.votes if vote[2] == track.name)
+
+    def update(self, faces, timestamp):
+        """Fold one frame's detections into the tracks.
+
+        ``faces`` are ``FaceResult``s; those with ``encoding`` set were
+        encoded and matched, those with a ``track_id`` carry the track whose
+        identity the worker reused, and the rest were not encoded (see
+        ``select()``). Returns the faces with names and track ids filled,
+        ``confirmed`` once their track holds ``min_votes`` encodings or reused
+        a confirmed track's identity.
+        """
+        with self._lock:
+            for track_id in [t for t, track in self.tracks.items() if timestamp - track.last_seen > self.max_age]:
+                del self.tracks[track_id]
+
+            tracks = list(self.tracks.values())
+            fresh = [i for i, face in enumerate(faces) if face.track_id is None]
+            matches = associate([t.box for t in tracks], [faces[i].box for i in fresh], self.min_iou)
+            matched_tracks = {fresh[d]: tracks[t] for d, t in matches.items()}
+
+            updated = []
+            for i, face in enumerate(faces):
+                if face.track_id is not None and face.track_id in self.tracks:
+                    track = self.tracks[face.track_id]
+                elif i in matched_tracks:
+                    track = matched_tracks[i]
+                else:
+                    track = Track(next(self._ids), face.box, timestamp, timestamp)
+                    self.tracks[track.track_id] = track
+
+                track.box = face.box
+                # Workers can finish out of order, so never move last_seen backwards
+                track.last_seen = max(track.last_seen, timestamp)
+                track.hits += 1
+                reused = face.encoding is None and face.name is not None
+                if face.encoding is not None:
+                    self.encoded += 1
+                    self._vote(track, face, timestamp)
+                    track.last_encoded = timestamp
+                elif reused:
+                    # Identity reused from the hint; keep the hint's name if the track expired meanwhile
+                    self.reused += 1
+                    if track.name is None:
+                        track.name, track.distance, track.last_encoded = face.name, face.distance, timestamp
+                # Otherwise the face was not encoded and takes whatever identity its track has
+                confirmed = reused or len(track.votes) >= self.min_votes
+                updated.append(face._replace(
+                    name=track.name, distance=track.distance, track_id=track.track_id, confirmed=confirmed
+                ))
+            return updated